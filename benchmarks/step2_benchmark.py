@@ -0,0 +1,530 @@
+"""
+Step 2 benchmark
+Compares frame extraction modes on the clips in example_videos/ and on a
+deterministic synthetic corpus
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Add the repository root to Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import cv2
+import numpy as np
+
+from pipeline.Step_2_extract_frames import FEATURE_EXTRACTORS, FrameExtractor, FrameRecord, feature_sharpness, probe_video
+
+logger = logging.getLogger(__name__)
+
+EXAMPLE_VIDEOS_DIR = Path(__file__).parent.parent / "example_videos"
+
+SYNTHETIC_FPS = 30
+SYNTHETIC_SEED = 1234
+
+# (name, content, (width, height), seconds)
+SYNTHETIC_VIDEOS = [
+    ("cuts_640x360_10s", "cuts", (640, 360), 10),
+    ("pan_640x360_10s", "pan", (640, 360), 10),
+    ("static_640x360_10s", "static", (640, 360), 10),
+    ("mixed_1280x720_20s", "mixed", (1280, 720), 20),
+    ("pan_1920x1080_5s", "pan", (1920, 1080), 5),
+    ("cuts_320x240_30s", "cuts", (320, 240), 30),
+]
+
+# Synthetic clip the decode-modes suite adds for keyframe/linear parity
+DECODE_PARITY_VIDEO = "cuts_320x240_30s"
+
+# Mode name -> (FrameExtractor options, extract_frames arguments)
+CORPUS_MODES = {
+    "seek": ({}, {"decode_mode": "seek"}),
+    "linear": ({}, {"decode_mode": "linear"}),
+    "keyframes": ({}, {"decode_mode": "keyframes"}),
+    "ffmpeg": ({}, {"decode_mode": "ffmpeg"}),
+    "adaptive": ({}, {"decode_mode": "linear", "adaptive": True}),
+    "histogram": ({"scorer": "histogram"}, {"decode_mode": "linear"}),
+    "ffmpeg_histogram": ({"scorer": "histogram"}, {"decode_mode": "ffmpeg"}),
+    "top_k": ({}, {"selection": "top_k"}),
+    "workers_2": ({}, {"workers": 2}),
+}
+
+def run_extraction(video_path: Path, repeats: int, extractor_options: dict = None, **kwargs) -> dict:
+    """Run FrameExtractor.extract_frames and return the best wall time and selection."""
+    best_time = None
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            extractor = FrameExtractor(video_path, Path(temp_dir), **(extractor_options or {}))
+            start = time.perf_counter()
+            frames = extractor.extract_frames(**kwargs)
+            elapsed = time.perf_counter() - start
+        best_time = elapsed if best_time is None else min(best_time, elapsed)
+    
+    return {
+        "wall_time": best_time,
+        "frames_sampled": extractor.frames_sampled,
+        "frames_decoded": extractor.frames_decoded,
+        "selected": [frame.name for frame in frames],
+        "timestamps": [round(frame.timestamp, 2) for frame in frames],
+        "feature_timings": extractor.get_feature_timings(),
+        "memory": extractor.get_memory_usage()
+    }
+
+def run_segment_pass(video_path: Path, repeats: int, workers: int, max_frames: int) -> dict:
+    """
+    Run extract_frames on the segment scoring path and return the best wall
+    time and selection. segmented=True keeps one worker on that path, so the
+    parallel benchmark's baseline runs the same algorithm.
+    """
+    best_time = None
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            extractor = FrameExtractor(video_path, Path(temp_dir))
+            start = time.perf_counter()
+            frames = extractor.extract_frames(max_frames=max_frames, workers=workers, segmented=True)
+            elapsed = time.perf_counter() - start
+        best_time = elapsed if best_time is None else min(best_time, elapsed)
+    
+    return {
+        "wall_time": best_time,
+        "timestamps": [round(frame.timestamp, 2) for frame in frames]
+    }
+
+def build_looped_video(video_path: Path, loops: int, output_path: Path) -> Path:
+    """Write video_path back to back `loops` times to stand in for a long upload."""
+    cap = cv2.VideoCapture(str(video_path))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    writer = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for _ in range(loops):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            writer.write(frame)
+    writer.release()
+    cap.release()
+    return output_path
+
+def build_blurred_video(video_path: Path, every: int, kernel: int, output_path: Path) -> Path:
+    """Write video_path with every `every`-th frame motion blurred by a kernel-wide horizontal smear."""
+    cap = cv2.VideoCapture(str(video_path))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    writer = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    smear = np.full((1, kernel), 1.0 / kernel, dtype=np.float32)
+    index = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        writer.write(cv2.filter2D(frame, -1, smear) if index % every else frame)
+        index += 1
+    writer.release()
+    cap.release()
+    return output_path
+
+def selected_sharpness(frames) -> List[float]:
+    """Sharpness of each selected frame, measured on its encoded JPEG."""
+    if not frames:
+        return []
+    records = [FrameRecord(cv2.imdecode(np.frombuffer(frame.jpeg, np.uint8), cv2.IMREAD_COLOR), frame.timestamp, 0, 320)
+               for frame in frames]
+    return [float(value) for value in feature_sharpness(records, [None] * len(records))]
+
+def render_texture(rng, size: Tuple[int, int]) -> np.ndarray:
+    """A smooth random colour field with a few hard-edged shapes, so frames have both flat areas and edges."""
+    width, height = size
+    coarse = rng.integers(0, 256, (height // 32 + 2, width // 32 + 2, 3), dtype=np.uint8)
+    texture = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+    for _ in range(8):
+        colour = tuple(int(c) for c in rng.integers(0, 256, 3))
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        if rng.random() < 0.5:
+            cv2.circle(texture, center, int(rng.integers(height // 16, height // 4)), colour, -1)
+        else:
+            corner = (center[0] + int(rng.integers(width // 16, width // 4)),
+                      center[1] + int(rng.integers(height // 16, height // 4)))
+            cv2.rectangle(texture, center, corner, colour, -1)
+    return texture
+
+def synthetic_frames(content: str, size: Tuple[int, int], frame_count: int, rng):
+    """
+    Yield the frames of a synthetic clip.
+    "cuts" holds a new shot every two seconds, "pan" slides across a wide
+    texture, "static" is one shot with sensor-like noise and "mixed" plays
+    static, pan and cut sections back to back.
+    """
+    width, height = size
+    if content == "mixed":
+        section = frame_count // 3
+        for part, count in (("static", section), ("pan", section), ("cuts", frame_count - 2 * section)):
+            yield from synthetic_frames(part, size, count, rng)
+        return
+    
+    if content == "pan":
+        panorama = render_texture(rng, (width * 3, height))
+        step = (width * 2) / max(frame_count - 1, 1)
+        for index in range(frame_count):
+            x = int(index * step)
+            yield panorama[:, x:x + width]
+    elif content == "static":
+        shot = render_texture(rng, size).astype(np.int16)
+        for _ in range(frame_count):
+            noise = rng.integers(-3, 4, shot.shape, dtype=np.int16)
+            yield np.clip(shot + noise, 0, 255).astype(np.uint8)
+    elif content == "cuts":
+        shot_length = SYNTHETIC_FPS * 2
+        for index in range(frame_count):
+            if index % shot_length == 0:
+                shot = render_texture(rng, size)
+            yield shot
+    else:
+        raise ValueError(f"Unknown synthetic content: {content}")
+
+def build_synthetic_corpus(output_dir: Path) -> List[Path]:
+    """Write SYNTHETIC_VIDEOS to output_dir, reusing clips that already exist. Output is the same on every run."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    videos = []
+    for name, content, size, seconds in SYNTHETIC_VIDEOS:
+        output_path = output_dir / f"{name}.mp4"
+        if not output_path.exists():
+            rng = np.random.default_rng(SYNTHETIC_SEED)
+            writer = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*'mp4v'), SYNTHETIC_FPS, size)
+            for frame in synthetic_frames(content, size, SYNTHETIC_FPS * seconds, rng):
+                writer.write(frame)
+            writer.release()
+        videos.append(output_path)
+    return videos
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process and its finished children in MiB.
+    On Linux ru_maxrss survives exec, so a spawned worker would report its
+    parent's peak; the process's own peak is read from VmHWM instead.
+    """
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            own = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+        return max(own, children) / 1024
+    except (OSError, StopIteration, ValueError):
+        peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, children)
+        # ru_maxrss is in bytes on macOS and KiB elsewhere
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def measure_mode(video_path: Path, repeats: int, extractor_options: dict, kwargs: dict) -> dict:
+    """
+    Run one mode in the current process and report time, throughput and memory.
+    Meant to be called in a freshly spawned process, whose own peak RSS
+    (see peak_rss_mb) then belongs to this mode alone.
+    """
+    result = run_extraction(video_path, repeats, extractor_options, **kwargs)
+    frame_count = probe_video(video_path).frame_count
+    return {
+        "wall_time": round(result["wall_time"], 4),
+        "decode_fps": round(frame_count / result["wall_time"], 1) if result["wall_time"] else None,
+        "frames_sampled": result["frames_sampled"],
+        "frames_decoded": result["frames_decoded"],
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "frame_buffers_mb": result["memory"]["frame_buffers_mb"],
+        "timestamps": result["timestamps"],
+    }
+
+def git_revision() -> Optional[str]:
+    """Commit the benchmark ran against, if this is a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def match_timestamps(reference: List[float], candidate: List[float], tolerance: float) -> float:
+    """Fraction of reference timestamps that have a candidate within tolerance seconds."""
+    if not reference:
+        return 1.0 if not candidate else 0.0
+    matched = sum(1 for t in reference if any(abs(t - c) <= tolerance for c in candidate))
+    return matched / len(reference)
+
+def benchmark_decode_modes(videos, args):
+    """
+    Compare seek, linear, keyframe-only and ffmpeg decoding on each video,
+    plus the synthetic cuts clip (a cut every 2 s, at the default spacing),
+    with recall measured against the linear selection.
+    """
+    corpus_dir = args.corpus_dir or Path(tempfile.mkdtemp(prefix="step2_corpus_"))
+    cuts = [path for path in build_synthetic_corpus(corpus_dir) if path.stem == DECODE_PARITY_VIDEO]
+    print(f"{'video':<20} {'mode':<10} {'time (s)':>9} {'sampled':>8} {'decoded':>8} {'recall':>7}  timestamps")
+    for video_path in list(videos) + cuts:
+        reference = None
+        for mode in ("linear", "seek", "keyframes", "ffmpeg"):
+            result = run_extraction(video_path, args.repeats, decode_mode=mode, max_frames=args.max_frames)
+            reference = reference or result
+            recall = match_timestamps(reference["timestamps"], result["timestamps"], args.tolerance)
+            print(f"{video_path.name[:20]:<20} {mode:<10} {result['wall_time']:>9.3f} "
+                  f"{result['frames_sampled']:>8} {result['frames_decoded']:>8} {recall:>7.2f}  {result['timestamps']}")
+
+def benchmark_backends(videos, args):
+    """
+    Compare OpenCV linear decoding against the ffmpeg rawvideo pipe, which
+    samples and scales frames inside ffmpeg, for both scorers. Recall is
+    measured against the OpenCV selection.
+    """
+    print(f"{'video':<20} {'scorer':<10} {'backend':<8} {'time (s)':>9} {'speedup':>8} {'decode fps':>10} "
+          f"{'sampled':>8} {'recall':>7}  timestamps")
+    for video_path in videos:
+        frame_count = probe_video(video_path).frame_count
+        for scorer in ("flow", "histogram"):
+            reference = run_extraction(video_path, args.repeats, {"scorer": scorer}, decode_mode="linear",
+                                       max_frames=args.max_frames)
+            for backend, result in (
+                ("opencv", reference),
+                ("ffmpeg", run_extraction(video_path, args.repeats, {"scorer": scorer}, decode_mode="ffmpeg",
+                                          max_frames=args.max_frames)),
+            ):
+                recall = match_timestamps(reference["timestamps"], result["timestamps"], args.tolerance)
+                print(f"{video_path.name[:20]:<20} {scorer:<10} {backend:<8} {result['wall_time']:>9.3f} "
+                      f"{reference['wall_time'] / result['wall_time']:>8.2f} {frame_count / result['wall_time']:>10.1f} "
+                      f"{result['frames_sampled']:>8} {recall:>7.2f}  {result['timestamps']}")
+
+def benchmark_analysis_size(videos, args):
+    """Compare scoring at full resolution against downscaled analysis frames."""
+    print(f"{'video':<20} {'size':>6} {'time (s)':>9} {'speedup':>8} {'recall':>7}  timestamps")
+    for video_path in videos:
+        reference = run_extraction(video_path, args.repeats, {"analysis_size": 0}, decode_mode="linear")
+        print(f"{video_path.name[:20]:<20} {'full':>6} {reference['wall_time']:>9.3f} {1.0:>8.2f} {1.0:>7.2f}  "
+              f"{reference['timestamps']}")
+        for size in args.sizes:
+            result = run_extraction(video_path, args.repeats, {"analysis_size": size}, decode_mode="linear")
+            recall = match_timestamps(reference["timestamps"], result["timestamps"], args.tolerance)
+            print(f"{video_path.name[:20]:<20} {size:>6} {result['wall_time']:>9.3f} "
+                  f"{reference['wall_time'] / result['wall_time']:>8.2f} {recall:>7.2f}  {result['timestamps']}")
+
+def benchmark_scorers(videos, args):
+    """Compare the flow scorer against the histogram scorer."""
+    print(f"{'video':<20} {'scorer':<10} {'time (s)':>9} {'sampled':>8}  timestamps")
+    for video_path in videos:
+        for scorer in ("flow", "histogram"):
+            result = run_extraction(video_path, args.repeats, {"scorer": scorer}, max_frames=args.max_frames)
+            print(f"{video_path.name[:20]:<20} {scorer:<10} {result['wall_time']:>9.3f} "
+                  f"{result['frames_sampled']:>8}  {result['timestamps']}")
+
+def benchmark_streaming(videos, args):
+    """
+    Count frames the linear decoder actually decodes (grabs, reads and the
+    frames a seek decodes from its keyframe) against the frames in long
+    (looped) videos; the spacing window after each save is only skipped
+    when it reaches past a keyframe.
+    """
+    frame_interval = 5
+    print(f"{'video':<20} {'length (s)':>10} {'frames':>7} {'decoded':>8} {'sampled':>8} {'saved':>6} {'time (s)':>9}")
+    for video_path in videos:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            long_video = build_looped_video(video_path, args.loops, Path(temp_dir) / "long.mp4")
+            cap = cv2.VideoCapture(str(long_video))
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            length = frame_count / cap.get(cv2.CAP_PROP_FPS)
+            cap.release()
+            
+            result = run_extraction(long_video, args.repeats, decode_mode="linear",
+                                    frame_interval=frame_interval, max_frames=args.max_frames)
+            print(f"{video_path.name[:20]:<20} {length:>10.1f} {frame_count:>7} {result['frames_decoded']:>8} "
+                  f"{result['frames_sampled']:>8} {len(result['selected']):>6} {result['wall_time']:>9.3f}")
+
+def benchmark_adaptive(videos, args):
+    """
+    Compare decoded frames (grabs, reads and the frames seeks decode from
+    their keyframe) with fixed and adaptive strides under each decode mode.
+    """
+    print(f"{'video':<20} {'sampling':<9} {'mode':<7} {'frames':>7} {'decoded':>8} {'sampled':>8} {'time (s)':>9}"
+          f"  timestamps")
+    for video_path in videos:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            long_video = build_looped_video(video_path, args.loops, Path(temp_dir) / "long.mp4")
+            cap = cv2.VideoCapture(str(long_video))
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+            for adaptive in (False, True):
+                for mode in ("linear", "seek"):
+                    result = run_extraction(long_video, args.repeats, adaptive=adaptive, decode_mode=mode,
+                                            max_frames=args.max_frames)
+                    print(f"{video_path.name[:20]:<20} {'adaptive' if adaptive else 'fixed':<9} {mode:<7} "
+                          f"{frame_count:>7} {result['frames_decoded']:>8} {result['frames_sampled']:>8} "
+                          f"{result['wall_time']:>9.3f}  {result['timestamps']}")
+
+def benchmark_parallel(videos, args):
+    """
+    Measure parallel segment scoring against worker count on long (looped)
+    videos. Speedup and selection are compared with a one-worker segment
+    pass, not with the greedy sequential path, which selects differently.
+    """
+    print(f"{'video':<20} {'workers':>7} {'time (s)':>9} {'speedup':>8} {'same':>5}  timestamps")
+    for video_path in videos:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            long_video = build_looped_video(video_path, args.loops, Path(temp_dir) / "long.mp4")
+            baseline = None
+            for workers in sorted({1, *args.workers}):
+                result = run_segment_pass(long_video, args.repeats, workers, args.max_frames)
+                baseline = baseline or result
+                print(f"{video_path.name[:20]:<20} {workers:>7} {result['wall_time']:>9.3f} "
+                      f"{baseline['wall_time'] / result['wall_time']:>8.2f} "
+                      f"{str(result['timestamps'] == baseline['timestamps']):>5}  {result['timestamps']}")
+
+def benchmark_features(videos, args):
+    """
+    Report the cost of each scoring feature under top_k selection and how
+    much the selection changes without it (recall against all features on).
+    """
+    all_features = {name: 1.0 for name in FEATURE_EXTRACTORS}
+    print(f"{'video':<20} {'feature':<10} {'ms/frame':>9} {'frames':>7} {'recall w/o':>10}  timestamps w/o")
+    for video_path in videos:
+        reference = run_extraction(video_path, args.repeats, {"feature_weights": all_features},
+                                   selection="top_k", max_frames=args.max_frames)
+        print(f"{video_path.name[:20]:<20} {'(all)':<10} {'':>9} {'':>7} {'':>10}  {reference['timestamps']}")
+        for name in all_features:
+            weights = {**all_features, name: 0.0}
+            result = run_extraction(video_path, args.repeats, {"feature_weights": weights},
+                                    selection="top_k", max_frames=args.max_frames)
+            timing = reference["feature_timings"].get(name, {"ms_per_frame": 0.0, "frames": 0})
+            recall = match_timestamps(reference["timestamps"], result["timestamps"], args.tolerance)
+            print(f"{video_path.name[:20]:<20} {name:<10} {timing['ms_per_frame']:>9.2f} {timing['frames']:>7} "
+                  f"{recall:>10.2f}  {result['timestamps']}")
+
+def benchmark_blur(videos, args):
+    """Compare the sharpness of saved frames with blur rejection off and on, on partly blurred copies."""
+    print(f"{'video':<20} {'blur_ratio':>10} {'saved':>6} {'min sharp':>10} {'median':>8} {'time (s)':>9}  timestamps")
+    for video_path in videos:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            blurred = build_blurred_video(video_path, 3, 31, Path(temp_dir) / "blurred.mp4")
+            for blur_ratio in (0.0, FrameExtractor.DEFAULT_BLUR_RATIO):
+                extractor = FrameExtractor(blurred, Path(temp_dir), blur_ratio=blur_ratio)
+                start = time.perf_counter()
+                frames = extractor.extract_frames(max_frames=args.max_frames)
+                elapsed = time.perf_counter() - start
+                sharpness = selected_sharpness(frames) or [0.0]
+                print(f"{video_path.name[:20]:<20} {blur_ratio:>10.2f} {len(frames):>6} {min(sharpness):>10.0f} "
+                      f"{float(np.median(sharpness)):>8.0f} {elapsed:>9.3f}  "
+                      f"{[round(frame.timestamp, 2) for frame in frames]}")
+
+def benchmark_api_images(videos, args):
+    """Compare the bytes uploaded to the vision APIs with full frames and with downscaled upload copies."""
+    print(f"{'video':<20} {'api size':>8} {'frames':>6} {'full (KB)':>9} {'upload (KB)':>11} {'base64 (KB)':>11} {'ratio':>6}")
+    for video_path in videos:
+        for api_image_size in (0, *args.api_sizes):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                extractor = FrameExtractor(video_path, Path(temp_dir), api_image_size=api_image_size,
+                                           api_image_quality=args.api_quality)
+                frames = extractor.extract_frames(max_frames=args.max_frames)
+            full = sum(len(frame.jpeg) for frame in frames)
+            upload = sum(len(frame.api_jpeg) for frame in frames)
+            base64_size = sum(4 * ((len(frame.api_jpeg) + 2) // 3) for frame in frames)
+            print(f"{video_path.name[:20]:<20} {api_image_size or 'full':>8} {len(frames):>6} {full / 1024:>9.0f} "
+                  f"{upload / 1024:>11.0f} {base64_size / 1024:>11.0f} {upload / full if full else 1.0:>6.2f}")
+
+def benchmark_corpus(videos, args):
+    """
+    Run every CORPUS_MODES entry on the synthetic corpus plus the given videos
+    and write the results as JSON so runs can be diffed between commits.
+    Each mode runs in a freshly spawned process so its peak RSS is not
+    inflated by earlier runs.
+    """
+    corpus_dir = args.corpus_dir or Path(tempfile.mkdtemp(prefix="step2_corpus_"))
+    corpus = build_synthetic_corpus(corpus_dir) + list(videos)
+    modes = args.modes or list(CORPUS_MODES)
+    
+    results: List[Dict] = []
+    print(f"{'video':<20} {'mode':<10} {'time (s)':>9} {'decode fps':>10} {'sampled':>8} {'decoded':>8} "
+          f"{'rss (MiB)':>9} {'buffers':>8}  timestamps")
+    for video_path in corpus:
+        probe = probe_video(video_path)
+        for mode in modes:
+            extractor_options, kwargs = CORPUS_MODES[mode]
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                measurement = executor.submit(measure_mode, video_path, args.repeats, extractor_options,
+                                              {"max_frames": args.max_frames, **kwargs}).result()
+            results.append({"video": video_path.name, "duration": round(probe.duration, 2),
+                            "size": [probe.width, probe.height], "mode": mode, **measurement})
+            print(f"{video_path.name[:20]:<20} {mode:<10} {measurement['wall_time']:>9.3f} "
+                  f"{measurement['decode_fps'] or 0:>10.1f} {measurement['frames_sampled']:>8} "
+                  f"{measurement['frames_decoded']:>8} "
+                  f"{measurement['peak_rss_mb']:>9.1f} {measurement['frame_buffers_mb']:>8.1f}  {measurement['timestamps']}")
+    
+    report = {
+        "commit": git_revision(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+        "repeats": args.repeats,
+        "max_frames": args.max_frames,
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {len(results)} results to {args.output}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("videos", nargs="*", type=Path, help="Videos to benchmark (default: example_videos/*.mp4)")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per measurement, best time is reported")
+    parser.add_argument("--suite", choices=["decode-modes", "analysis-size", "scorers", "streaming", "adaptive", "parallel", "features", "blur", "corpus", "api-images", "backends"],
+                        default="decode-modes",
+                        help="Which comparison to run")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[640, 320, 160],
+                        help="Analysis sizes for the analysis-size suite")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Seconds within which two selected timestamps count as the same frame")
+    parser.add_argument("--loops", type=int, default=10,
+                        help="Times each clip is repeated to build a long video for the streaming, adaptive and parallel suites")
+    parser.add_argument("--max-frames", type=int, default=100,
+                        help="max_frames for the decode-modes, scorers, streaming, adaptive, parallel, features, blur, corpus and backends suites")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Worker counts for the parallel suite")
+    parser.add_argument("--api-sizes", type=int, nargs="+", default=[1024, FrameExtractor.DEFAULT_API_IMAGE_SIZE, 512],
+                        help="Upload copy sizes for the api-images suite")
+    parser.add_argument("--api-quality", type=int, default=FrameExtractor.DEFAULT_API_IMAGE_QUALITY,
+                        help="JPEG quality of the upload copies for the api-images suite")
+    parser.add_argument("--modes", nargs="+", choices=list(CORPUS_MODES),
+                        help="Modes for the corpus suite (default: all)")
+    parser.add_argument("--corpus-dir", type=Path,
+                        help="Where the corpus suite writes and reuses synthetic videos (default: a temporary directory)")
+    parser.add_argument("--output", type=Path, default=Path("step2_benchmark.json"),
+                        help="JSON results file for the corpus suite")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    videos = args.videos or sorted(EXAMPLE_VIDEOS_DIR.glob("*.mp4"))
+    if args.suite == "analysis-size":
+        benchmark_analysis_size(videos, args)
+    elif args.suite == "scorers":
+        benchmark_scorers(videos, args)
+    elif args.suite == "streaming":
+        benchmark_streaming(videos, args)
+    elif args.suite == "adaptive":
+        benchmark_adaptive(videos, args)
+    elif args.suite == "parallel":
+        benchmark_parallel(videos, args)
+    elif args.suite == "features":
+        benchmark_features(videos, args)
+    elif args.suite == "blur":
+        benchmark_blur(videos, args)
+    elif args.suite == "corpus":
+        benchmark_corpus(videos, args)
+    elif args.suite == "api-images":
+        benchmark_api_images(videos, args)
+    elif args.suite == "backends":
+        benchmark_backends(videos, args)
+    else:
+        benchmark_decode_modes(videos, args)
+
+if __name__ == "__main__":
+    main()
@@ -519,22 +519,26 @@ class VideoBot:
                     "30% ▰▰▰▱▱▱▱▱▱▱"
                 )
                 
+                # Read the video properties once for every step that needs them
+                probe = await asyncio.to_thread(Step_2_extract_frames.probe_video, Path(video_path))
+                
                 key_frames, scene_changes, motion_scores, duration, file_metadata = Step_2_extract_frames.execute_step(
                     video_file=video_path,
-                    output_dir=output_dir
+                    output_dir=output_dir,
+                    probe=probe
                 )
                 
                 # Convert any numpy floats to Python floats
                 duration = float(duration)
-                motion_scores = [(path, float(score)) for path, score in motion_scores]
+                motion_scores = [(frame, float(score)) for frame, score in motion_scores]
                 
                 # Combine metadata from file and provided metadata
                 combined_metadata = {
                     **(file_metadata or {}),  # Metadata from video file
                     **(metadata or {}),       # Provided metadata
                     'duration': duration,
-                    'scene_changes': [str(p) for p in scene_changes],
-                    'motion_scores': [(str(p), score) for p, score in motion_scores],
+                    'scene_changes': [frame.name for frame in scene_changes],
+                    'motion_scores': [(frame.name, score) for frame, score in motion_scores],
                     'language': settings['language']  # Add language to metadata
                 }
                 
@@ -551,7 +555,6 @@ class VideoBot:
                 )
                 
                 frames_info = await Step_3_analyze_frames.execute_step(
-                    frames_dir=output_dir / "frames",
                     output_dir=output_dir,
                     metadata=frames_info['metadata'],
                     scene_changes=scene_changes,
@@ -596,7 +599,8 @@ class VideoBot:
                     Path(video_path),
                     Path(str(audio_path)),
                     output_dir,
-                    settings['style']
+                    settings['style'],
+                    video_size=probe.display_size
                 )
                 
                 if not final_video:
@@ -1024,46 +1028,41 @@ class VideoBot:
                 with open(metadata_file, 'w', encoding='utf-8') as f:
                     json.dump(metadata, f, indent=2, ensure_ascii=False)
             
-            # Extract frames
+            # Extract frames as a stream so analysis starts on the first frames found
             logger.info("Extracting frames...")
-            key_frames, scene_changes, motion_scores, duration, file_metadata = Step_2_extract_frames.execute_step(
+            # Read the video properties once for every step that needs them
+            probe = await asyncio.to_thread(Step_2_extract_frames.probe_video, Path(video_path))
+            
+            frames, duration, file_metadata = Step_2_extract_frames.execute_step_streaming(
                 video_file=video_path,
-                output_dir=output_dir
+                output_dir=output_dir,
+                probe=probe
             )
             
             # Convert any numpy floats to Python floats
             duration = float(duration)
-            motion_scores = [(path, float(score)) for path, score in motion_scores]
             
             # Combine metadata from file and provided metadata
+            # (Step 3 adds scene changes and motion scores once the stream ends)
             combined_metadata = {
                 **(file_metadata or {}),  # Metadata from video file
                 **(metadata or {}),       # Provided metadata
                 'duration': duration,
-                'scene_changes': [str(p) for p in scene_changes],
-                'motion_scores': [(str(p), score) for p, score in motion_scores],
                 'language': settings['language']  # Add language to metadata
             }
             
-            # Store frame info for later steps
-            frames_info = {
-                'metadata': combined_metadata
-            }
-            
             # Update status
             await status_message.edit_text(
                 "🔍 Analyzing video content...\n\n"
                 "50% ▰▰▰▰▰▱▱▱▱▱"
             )
             
-            # Analyze frames
+            # Analyze frames while they are being extracted
             logger.info("Analyzing frames...")
-            frames_info = await Step_3_analyze_frames.execute_step(
-                frames_dir=output_dir / "frames",
+            frames_info = await Step_3_analyze_frames.execute_stream_step(
                 output_dir=output_dir,
-                metadata=frames_info['metadata'],
-                scene_changes=scene_changes,
-                motion_scores=motion_scores,
+                metadata=combined_metadata,
+                frames=frames,
                 video_duration=duration
             )
             
@@ -1107,7 +1106,8 @@ class VideoBot:
                 Path(video_path),
                 Path(str(audio_path)),
                 output_dir,
-                settings['style']
+                settings['style'],
+                video_size=probe.display_size
             )
             
             if final_video:
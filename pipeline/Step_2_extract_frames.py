@@ -3,70 +3,474 @@ Step 2: Frame extraction module
 Extracts key frames from video using scene detection and motion analysis
 """
 
+import asyncio
+import bisect
+import hashlib
+import json
 import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
 import cv2
 import numpy as np
+import psutil
 
 logger = logging.getLogger(__name__)
 
-class FrameExtractor:
-    """Handles video frame extraction with intelligent frame selection."""
+def _downscaled_size(frame_shape: Tuple[int, ...], max_size: int) -> Tuple[Tuple[int, int], float]:
+    """(width, height) of a frame with its longest side cut to max_size, and the resized/full scale."""
+    longest_side = max(frame_shape[:2])
+    if not max_size or longest_side <= max_size:
+        return (frame_shape[1], frame_shape[0]), 1.0
+    
+    scale = max_size / longest_side
+    return (max(1, round(frame_shape[1] * scale)), max(1, round(frame_shape[0] * scale))), scale
+
+def downscale_frame(frame: np.ndarray, max_size: int, dst: Optional[np.ndarray] = None) -> Tuple[np.ndarray, float]:
+    """
+    Resize a frame so its longest side is at most max_size.
+    Returns the resized copy and the full-resolution/resized scale factor.
+    The copy is written into dst when it has the right shape.
+    """
+    size, scale = _downscaled_size(frame.shape, max_size)
+    if scale == 1.0:
+        return frame, 1.0
+    return cv2.resize(frame, size, dst=dst, interpolation=cv2.INTER_AREA), 1.0 / scale
+
+def compute_dhash(gray: np.ndarray) -> int:
+    """
+    Compute a 64-bit difference hash of a grayscale image.
+    Each bit records whether a pixel of the 9x8 thumbnail is brighter than its left neighbour.
+    """
+    thumbnail = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = thumbnail[:, 1:] > thumbnail[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming_distance(hash1: int, hash2: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(hash1 ^ hash2).count("1")
+
+class FrameRecord:
+    """
+    A sampled frame with the analysis planes every scorer shares.
+    The downscaled copy is made once and the grayscale plane is converted
+    at most once; scorers can cache their own features in `features`.
+    """
     
-    def __init__(self, video_path: Path, output_dir: Path):
+    def __init__(self, frame: np.ndarray, timestamp: float, frame_number: int, analysis_size: int,
+                 small_buffer: Optional[np.ndarray] = None, gray_buffer: Optional[np.ndarray] = None):
         """
-        Initialize frame extractor.
+        Initialize frame record.
         
         Args:
-            video_path: Path to video file
-            output_dir: Directory to save extracted frames
+            frame: Full-resolution BGR frame, used when the frame is saved
+            timestamp: Presentation time in seconds
+            frame_number: Index of the frame in the stream
+            analysis_size: Longest side in pixels of the analysis copy (0 for full resolution)
+            small_buffer: Preallocated array for the analysis copy (see FrameRing)
+            gray_buffer: Preallocated array for the grayscale plane
         """
-        self.video_path = video_path
-        self.frames_dir = output_dir / "frames"
-        self.frames_dir.mkdir(parents=True, exist_ok=True)
-        self.scene_changes = []
-        self.motion_scores = []
-        
-        # Load object detection models only if needed
-        self.face_cascade = None
-        self.body_cascade = None
-    
-    def _load_detection_models(self):
-        """Lazy load detection models only when needed."""
-        if self.face_cascade is None:
-            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            self.body_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_fullbody.xml')
+        self.frame = frame
+        self.timestamp = timestamp
+        self.frame_number = frame_number
+        self.small, self.scale = downscale_frame(frame, analysis_size, small_buffer)
+        self.features: Dict[str, Any] = {}
+        self._gray = None
+        self._gray_buffer = gray_buffer
     
-    def _compute_frame_difference(self, frame1: np.ndarray, frame2: np.ndarray) -> float:
+    @classmethod
+    def from_analysis_plane(cls, plane: np.ndarray, timestamp: float, frame_number: int,
+                            scale: float) -> "FrameRecord":
         """
-        Compute the difference between two frames.
-        Uses grayscale conversion and absolute difference.
+        Record for a frame decoded straight at analysis size (the ffmpeg
+        decode mode). plane is BGR, or the grayscale plane when only luma was
+        decoded; scale is full-resolution/plane size. The full-resolution
+        frame is None until it is read back for saving.
+        """
+        record = cls(plane, timestamp, frame_number, 0)
+        record.frame = None
+        record.scale = scale
+        if plane.ndim == 2:
+            record._gray = plane
+        return record
+    
+    @property
+    def gray(self) -> np.ndarray:
+        """Downscaled grayscale plane, converted on first use."""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self._gray_buffer)
+        return self._gray
+    
+    @property
+    def dhash(self) -> int:
+        """Perceptual difference hash of the grayscale plane, cached in features."""
+        if "dhash" not in self.features:
+            self.features["dhash"] = compute_dhash(self.gray)
+        return self.features["dhash"]
+    
+    @property
+    def mean_intensity(self) -> float:
+        """Mean of the grayscale plane, cached in features. Tells flat frames apart where dHash cannot."""
+        if "mean_intensity" not in self.features:
+            self.features["mean_intensity"] = float(self.gray.mean())
+        return self.features["mean_intensity"]
+
+class FrameRing:
+    """
+    Preallocated full-resolution frames, with analysis and grayscale planes,
+    that decoding writes into in turn. A job then holds a fixed number of
+    frames however long the video is, instead of a fresh allocation per
+    sample.
+    
+    A record's full-resolution frame is rewritten `batch` reads later, so it
+    must be saved before the next batch is decoded; its analysis planes last
+    `batch + keep` reads, which covers the previous record that pairwise
+    features compare against. Without downscaling the analysis copy is the
+    frame itself, so frames then last `batch + keep` reads as well.
+    """
+    
+    def __init__(self, batch: int, keep: int, frame_shape: Tuple[int, int, int], analysis_size: int):
         """
-        gray1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2GRAY)
-        gray2 = cv2.cvtColor(frame2, cv2.COLOR_BGR2GRAY)
+        Initialize frame ring.
         
-        # Calculate absolute difference and normalize
-        diff = cv2.absdiff(gray1, gray2)
-        norm_diff = cv2.normalize(diff, None, 0, 255, cv2.NORM_MINMAX)
+        Args:
+            batch: Records scored together, whose full frames are alive at once
+            keep: Older records whose analysis planes must stay valid
+            frame_shape: (height, width, 3) of decoded frames
+            analysis_size: Longest side in pixels of the analysis copy (0 for full resolution)
+        """
+        (width, height), scale = _downscaled_size(frame_shape, analysis_size)
+        self.analysis_size = analysis_size
+        plane_slots = batch + keep
+        frame_slots = batch if scale < 1.0 else plane_slots
+        self.frames = [np.empty(frame_shape, dtype=np.uint8) for _ in range(frame_slots)]
+        self.smalls = [np.empty((height, width, 3), dtype=np.uint8) if scale < 1.0 else None
+                       for _ in range(plane_slots)]
+        self.grays = [np.empty((height, width), dtype=np.uint8) for _ in range(plane_slots)]
+        self._reads = -1
+    
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by all slots."""
+        return sum(array.nbytes for array in self.frames + self.smalls + self.grays if array is not None)
+    
+    @property
+    def _frame_slot(self) -> int:
+        return self._reads % len(self.frames)
+    
+    @property
+    def _plane_slot(self) -> int:
+        return self._reads % len(self.grays)
+    
+    def _advance(self) -> np.ndarray:
+        """Move to the next slot and return its frame buffer."""
+        self._reads += 1
+        return self.frames[self._frame_slot]
+    
+    def _keep(self, ret: bool, frame: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Return the decoded frame, adopting it as the slot's buffer if the decoder had to reallocate."""
+        if not ret:
+            return None
+        if frame is not self.frames[self._frame_slot]:
+            self.frames[self._frame_slot] = frame
+        return frame
+    
+    def read(self, cap: cv2.VideoCapture) -> Optional[np.ndarray]:
+        """Decode the next frame of cap into the next slot."""
+        buffer = self._advance()
+        return self._keep(*cap.read(buffer))
+    
+    def retrieve(self, cap: cv2.VideoCapture) -> Optional[np.ndarray]:
+        """Retrieve the frame cap last grabbed into the next slot."""
+        buffer = self._advance()
+        return self._keep(*cap.retrieve(buffer))
+    
+    def read_stream(self, stream) -> Optional[np.ndarray]:
+        """Fill the next slot with one raw frame from a binary stream such as an ffmpeg pipe."""
+        buffer = self._advance()
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < len(view):
+            count = stream.readinto(view[filled:])
+            if not count:
+                return None
+            filled += count
+        return buffer
+    
+    def record(self, frame: np.ndarray, timestamp: float, frame_number: int) -> FrameRecord:
+        """FrameRecord for the frame just read, with its analysis planes kept in the same slot."""
+        return FrameRecord(frame, timestamp, frame_number, self.analysis_size,
+                           self.smalls[self._plane_slot], self.grays[self._plane_slot])
+
+class SegmentCandidate(NamedTuple):
+    """
+    A sample that passed the thresholds on the segment path, waiting for
+    selection. Sorts by frame number; picklable for the process pool.
+    """
+    frame_number: int
+    timestamp: float
+    is_scene_change: bool
+    motion_score: float
+    dhash: int
+    mean_intensity: float
+    weighted_score: float  # Only computed for top_k selection
+    sharpness: float  # Only computed when blur rejection is on
+    blur_floor: float = 0.0  # Set by _mark_blurred when the candidate counts as blurred
+
+class SegmentResult(NamedTuple):
+    """What scoring one segment returns to the parent (see FrameExtractor._score_segment)."""
+    candidates: List[SegmentCandidate]
+    frames_sampled: int
+    frames_decoded: int
+    feature_timings: Dict[str, Dict[str, float]]
+    frame_buffer_bytes: int
+    peak_rss: int
+    sharpness: Dict[int, float]  # Frame number -> sharpness for every sample
+
+class FrameBundle:
+    """
+    A selected frame handed from Step 2 to the later steps in memory.
+    Holds the encoded JPEG with its timestamp and scores, so consumers
+    need neither the frames directory nor the timestamp in the file name.
+    """
+    
+    def __init__(
+        self,
+        jpeg: bytes,
+        timestamp: float,
+        motion_score: float,
+        is_scene_change: bool,
+        frame_hash: str,
+        path: Optional[Path] = None,
+        api_jpeg: Optional[bytes] = None
+    ):
+        """
+        Initialize frame bundle.
         
-        return np.mean(norm_diff)
+        Args:
+            jpeg: JPEG-encoded full-resolution frame
+            timestamp: Presentation time in seconds
+            motion_score: Motion score in full-resolution pixels
+            is_scene_change: Whether the frame was selected as a scene change
+            frame_hash: Perceptual hash of the frame (16 hex digits)
+            path: Where the frame was written, when frames are saved for debugging
+            api_jpeg: Smaller JPEG to upload to vision APIs (defaults to jpeg)
+        """
+        self.jpeg = jpeg
+        self.api_jpeg = jpeg if api_jpeg is None else api_jpeg
+        self.timestamp = timestamp
+        self.motion_score = motion_score
+        self.is_scene_change = is_scene_change
+        self.frame_hash = frame_hash
+        self.path = path
     
-    def _detect_motion(self, frame: np.ndarray, prev_frame: np.ndarray) -> float:
+    @property
+    def name(self) -> str:
+        """Display name of the frame, matching the debug file name."""
+        return f"frame_{self.timestamp:.2f}s.jpg"
+    
+    def __repr__(self) -> str:
+        return f"FrameBundle({self.name}, scene_change={self.is_scene_change}, motion={self.motion_score:.2f})"
+
+class VideoProbe:
+    """
+    Container-level facts about a video, collected once per job.
+    Later steps take this instead of reopening the file or asking an API.
+    """
+    
+    def __init__(
+        self,
+        duration: float,
+        fps: float,
+        frame_count: int,
+        width: int,
+        height: int,
+        codec: str,
+        rotation: int = 0
+    ):
         """
-        Detect motion between frames using optical flow.
-        Returns average magnitude of motion vectors.
+        Initialize video probe.
+        
+        Args:
+            duration: Duration in seconds
+            fps: Frame rate
+            frame_count: Number of frames
+            width: Coded frame width in pixels
+            height: Coded frame height in pixels
+            codec: Codec name (e.g. "h264")
+            rotation: Display rotation in degrees from the container
         """
-        if prev_frame is None:
-            return 0.0
-            
-        # Convert to grayscale
-        gray1 = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-        gray2 = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self.duration = duration
+        self.fps = fps
+        self.frame_count = frame_count
+        self.width = width
+        self.height = height
+        self.codec = codec
+        self.rotation = rotation
+    
+    @property
+    def display_size(self) -> Tuple[int, int]:
+        """Width and height as the video is shown, with rotation applied."""
+        if abs(self.rotation) % 180 == 90:
+            return self.height, self.width
+        return self.width, self.height
+    
+    @property
+    def aspect_ratio(self) -> float:
+        """Display width / height (0 when the height is unknown)."""
+        width, height = self.display_size
+        return width / height if height else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form for job metadata."""
+        return {
+            "duration": self.duration,
+            "fps": self.fps,
+            "frame_count": self.frame_count,
+            "width": self.width,
+            "height": self.height,
+            "codec": self.codec,
+            "rotation": self.rotation
+        }
+    
+    def __repr__(self) -> str:
+        return (f"VideoProbe({self.width}x{self.height} {self.codec}, {self.fps:.2f} fps, "
+                f"{self.frame_count} frames, {self.duration:.2f}s, rotation={self.rotation})")
+
+def _parse_rate(rate: Optional[str]) -> float:
+    """Parse an ffprobe rational such as "30000/1001"."""
+    try:
+        numerator, _, denominator = (rate or "").partition("/")
+        return float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+def _probe_with_ffprobe(video_file: Path) -> VideoProbe:
+    """Read the probe from the container headers with ffprobe (no decoding)."""
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries",
+            "stream=codec_name,width,height,r_frame_rate,avg_frame_rate,nb_frames,duration"
+            ":stream_tags=rotate:stream_side_data=rotation:format=duration",
+            "-of", "json",
+            str(video_file)
+        ],
+        capture_output=True, text=True, check=True
+    )
+    info = json.loads(result.stdout)
+    stream = info["streams"][0]
+    
+    # Same preference as OpenCV, so frame numbers agree with the capture
+    fps = _parse_rate(stream.get("r_frame_rate"))
+    average_fps = _parse_rate(stream.get("avg_frame_rate"))
+    if not fps or fps > 1000:
+        fps = average_fps
+    
+    duration = float(info.get("format", {}).get("duration") or stream.get("duration") or 0.0)
+    frame_count = int(stream.get("nb_frames") or 0) or int(round(duration * fps))
+    
+    rotation = int(stream.get("tags", {}).get("rotate", 0))
+    for side_data in stream.get("side_data_list", []):
+        rotation = int(side_data.get("rotation", rotation))
+    
+    return VideoProbe(duration, fps, frame_count, int(stream["width"]), int(stream["height"]),
+                      stream.get("codec_name", ""), rotation)
+
+def _probe_with_opencv(video_file: Path) -> VideoProbe:
+    """Read the probe from the OpenCV capture properties (opens the file once)."""
+    cap = cv2.VideoCapture(str(video_file))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_file}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        codec = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00 ").lower()
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        rotation = int(cap.get(cv2.CAP_PROP_ORIENTATION_META))
+        if cap.get(cv2.CAP_PROP_ORIENTATION_AUTO) and abs(rotation) % 180 == 90:
+            # Auto-orientation reports the rotated size; VideoProbe keeps the coded one
+            width, height = height, width
+        return VideoProbe(frame_count / fps if fps > 0 else 0, fps, frame_count, width, height, codec, rotation)
+    finally:
+        cap.release()
+
+def probe_video(video_file: Path) -> VideoProbe:
+    """
+    Collect duration, fps, frame count, resolution, codec and rotation in one pass.
+    Uses ffprobe when available and falls back to the OpenCV capture headers.
+    
+    Args:
+        video_file: Path to video file
         
-        # Calculate optical flow using Farneback method
+    Returns:
+        VideoProbe for the first video stream
+    """
+    if shutil.which("ffprobe"):
+        try:
+            return _probe_with_ffprobe(video_file)
+        except (subprocess.CalledProcessError, KeyError, IndexError, ValueError) as e:
+            logger.warning(f"ffprobe failed, reading video properties with OpenCV: {str(e)}")
+    return _probe_with_opencv(video_file)
+
+FeatureFunction = Callable[[List[FrameRecord], List[Optional[FrameRecord]]], np.ndarray]
+
+# name -> (function, scale, pairwise); see register_feature
+FEATURE_EXTRACTORS: Dict[str, Tuple[FeatureFunction, float, bool]] = {}
+
+def register_feature(name: str, scale: float, pairwise: bool = False):
+    """
+    Decorator registering a frame feature with the scoring engine.
+    
+    Args:
+        name: Feature name used in feature weights and timing reports
+        scale: Value counted as a moderate response; a feature value v
+            contributes v / (v + scale) to the weighted score
+        pairwise: The feature compares each frame with its predecessor,
+            so it is only computed for frames that have one
+    
+    The function receives a batch of records and their predecessors and
+    returns one value per record.
+    """
+    def decorator(function: FeatureFunction) -> FeatureFunction:
+        FEATURE_EXTRACTORS[name] = (function, scale, pairwise)
+        return function
+    return decorator
+
+@register_feature("absdiff", scale=30.0, pairwise=True)
+def feature_absdiff(records: List[FrameRecord], previous: List[FrameRecord]) -> np.ndarray:
+    """Mean absolute difference after min-max stretching to 0-255 (the scene-change measure)."""
+    gray = np.stack([record.gray for record in records]).astype(np.int16)
+    prev_gray = np.stack([record.gray for record in previous]).astype(np.int16)
+    diff = np.abs(gray - prev_gray).reshape(len(records), -1)
+    
+    # Same result as cv2.normalize(NORM_MINMAX) per frame; flat differences stretch to zero
+    low = diff.min(axis=1, keepdims=True)
+    span = diff.max(axis=1, keepdims=True) - low
+    stretch = np.where(span > 0, 255.0 / np.maximum(span, 1), 0.0)
+    return np.rint((diff - low) * stretch).mean(axis=1)
+
+@register_feature("flow", scale=2.0, pairwise=True)
+def feature_flow(records: List[FrameRecord], previous: List[FrameRecord]) -> np.ndarray:
+    """
+    Mean Farneback optical-flow magnitude in full-resolution pixels,
+    so thresholds keep their meaning whatever the analysis size.
+    """
+    magnitudes = np.empty(len(records))
+    for index, (record, prev_record) in enumerate(zip(records, previous)):
         flow = cv2.calcOpticalFlowFarneback(
-            gray1, gray2, None,
+            prev_record.gray, record.gray, None,
             pyr_scale=0.5,  # Pyramid scale
             levels=3,       # Number of pyramid levels
             winsize=15,     # Window size
@@ -75,197 +479,1831 @@ class FrameExtractor:
             poly_sigma=1.2, # Gaussian sigma
             flags=0
         )
+        magnitudes[index] = np.mean(np.sqrt(flow[..., 0]**2 + flow[..., 1]**2)) * record.scale
+    return magnitudes
+
+HISTOGRAM_BINS = (16, 4, 4)  # Hue, saturation, value
+
+def _hsv_histograms(records: List[FrameRecord]) -> np.ndarray:
+    """
+    Compute normalized HSV histograms for a batch of frames in one pass.
+    Histograms are cached on each record under features["hsv_hist"].
+    """
+    missing = list({id(record): record for record in records if "hsv_hist" not in record.features}.values())
+    if missing:
+        h_bins, s_bins, v_bins = HISTOGRAM_BINS
+        hsv = np.stack([cv2.cvtColor(record.small, cv2.COLOR_BGR2HSV) for record in missing])
+        hsv = hsv.reshape(len(missing), -1, 3).astype(np.int32)
         
-        # Calculate magnitude of flow vectors
-        magnitude = np.sqrt(flow[..., 0]**2 + flow[..., 1]**2)
-        return np.mean(magnitude)
+        # One joint bin index per pixel, offset per frame so a single bincount covers the batch
+        bins = (hsv[..., 0] * h_bins // 180) * s_bins * v_bins \
+            + (hsv[..., 1] * s_bins // 256) * v_bins \
+            + hsv[..., 2] * v_bins // 256
+        total_bins = h_bins * s_bins * v_bins
+        bins += np.arange(len(missing))[:, None] * total_bins
+        counts = np.bincount(bins.ravel(), minlength=len(missing) * total_bins)
+        hists = counts.reshape(len(missing), total_bins).astype(np.float32)
+        hists /= hists.sum(axis=1, keepdims=True)
+        
+        for record, hist in zip(missing, hists):
+            record.features["hsv_hist"] = hist
+    
+    return np.stack([record.features["hsv_hist"] for record in records])
+
+@register_feature("histogram", scale=0.2, pairwise=True)
+def feature_histogram(records: List[FrameRecord], previous: List[FrameRecord]) -> np.ndarray:
+    """Bhattacharyya distance between each frame's HSV histogram and its predecessor's."""
+    overlap = np.sqrt(_hsv_histograms(records) * _hsv_histograms(previous)).sum(axis=1)
+    return np.sqrt(np.clip(1.0 - overlap, 0.0, 1.0))
+
+@register_feature("sharpness", scale=100.0)
+def feature_sharpness(records: List[FrameRecord], previous: List[Optional[FrameRecord]]) -> np.ndarray:
+    """Variance of the 4-neighbour Laplacian; low values mean a blurry frame."""
+    gray = np.stack([record.gray for record in records]).astype(np.float32)
+    laplacian = gray[:, :-2, 1:-1] + gray[:, 2:, 1:-1] + gray[:, 1:-1, :-2] + gray[:, 1:-1, 2:] \
+        - 4 * gray[:, 1:-1, 1:-1]
+    return laplacian.reshape(len(records), -1).var(axis=1)
+
+_face_cascade = None
+
+@register_feature("faces", scale=1.0)
+def feature_faces(records: List[FrameRecord], previous: List[Optional[FrameRecord]]) -> np.ndarray:
+    """
+    Number of frontal faces found by the Haar cascade (loaded on first use).
+    OpenCV 5 moved the cascades to contrib; without them every frame scores 0.
+    """
+    global _face_cascade
+    if _face_cascade is None:
+        if hasattr(cv2, "CascadeClassifier"):
+            _face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        else:
+            logger.warning("Haar cascades not available in this OpenCV build, face feature disabled")
+            _face_cascade = False
+    if not _face_cascade:
+        return np.zeros(len(records))
+    return np.array([len(_face_cascade.detectMultiScale(record.gray, 1.3, 5)) for record in records], dtype=float)
+
+class ScoringEngine:
+    """
+    Computes registered frame features over batches and combines them into
+    one weighted score for ranking. Wall time and frame counts are kept per
+    feature, so features that cost more than they change the selection can
+    be given weight 0 (which stops them being computed for ranking).
+    """
     
-    def _detect_objects(self, frame: np.ndarray) -> int:
+    DEFAULT_WEIGHTS = {"absdiff": 1.0, "flow": 1.0, "histogram": 1.0}
+    
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
         """
-        Detect objects in frame using pre-trained models.
-        Currently detects faces and bodies.
+        Initialize scoring engine.
+        
+        Args:
+            weights: Feature name -> weight for the ranking score
+                (default DEFAULT_WEIGHTS); see FEATURE_EXTRACTORS for names
         """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        weights = self.DEFAULT_WEIGHTS if weights is None else weights
+        unknown = sorted(set(weights) - set(FEATURE_EXTRACTORS))
+        if unknown:
+            raise ValueError(f"Unknown features: {', '.join(unknown)}")
+        self.weights = {name: weight for name, weight in weights.items() if weight}
+        self.seconds: Dict[str, float] = {}
+        self.frames: Dict[str, int] = {}
+    
+    def compute(
+        self,
+        name: str,
+        records: List[FrameRecord],
+        previous: List[Optional[FrameRecord]],
+        indices: List[int],
+        values: Dict[str, np.ndarray]
+    ) -> np.ndarray:
+        """
+        Compute one feature for records[i], i in indices, skipping entries
+        already in values and, for pairwise features, records without a
+        predecessor. Values are stored in values[name] (NaN where not computed).
+        Per-record features are also cached on the records.
+        """
+        function, _, pairwise = FEATURE_EXTRACTORS[name]
+        column = values.setdefault(name, np.full(len(records), np.nan))
+        
+        todo = []
+        for index in indices:
+            if not np.isnan(column[index]) or (pairwise and previous[index] is None):
+                continue
+            if not pairwise and name in records[index].features:
+                column[index] = records[index].features[name]
+                continue
+            todo.append(index)
+        if not todo:
+            return column
         
-        # Detect faces
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+        start = time.perf_counter()
+        column[todo] = function([records[i] for i in todo], [previous[i] for i in todo])
+        self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+        self.frames[name] = self.frames.get(name, 0) + len(todo)
         
-        # Detect bodies
-        bodies = self.body_cascade.detectMultiScale(gray, 1.1, 3)
+        if not pairwise:
+            for index in todo:
+                records[index].features[name] = float(column[index])
+        return column
+    
+    def score(
+        self,
+        records: List[FrameRecord],
+        previous: List[Optional[FrameRecord]],
+        indices: List[int],
+        values: Dict[str, np.ndarray]
+    ) -> np.ndarray:
+        """Weighted score per record; features are computed for indices as needed."""
+        total = np.zeros(len(records))
+        for name, weight in self.weights.items():
+            column = self.compute(name, records, previous, indices, values)
+            scale = FEATURE_EXTRACTORS[name][1]
+            total += weight * np.nan_to_num(column / (column + scale))
+        return total
+    
+    def merge_timings(self, timings: Dict[str, Dict[str, float]]):
+        """Add timings reported by another engine (e.g. a worker process)."""
+        for name, timing in timings.items():
+            self.seconds[name] = self.seconds.get(name, 0.0) + timing["seconds"]
+            self.frames[name] = self.frames.get(name, 0) + timing["frames"]
+    
+    def timings(self) -> Dict[str, Dict[str, float]]:
+        """Per-feature seconds, frames computed and milliseconds per frame."""
+        return {
+            name: {
+                "seconds": seconds,
+                "frames": self.frames[name],
+                "ms_per_frame": 1000 * seconds / self.frames[name] if self.frames[name] else 0.0
+            }
+            for name, seconds in self.seconds.items()
+        }
+
+class FrameExtractor:
+    """Handles video frame extraction with intelligent frame selection."""
+    
+    DECODE_MODES = ("auto", "seek", "linear", "keyframes", "ffmpeg")
+    PIPE_DECODE_MODES = ("keyframes", "ffmpeg")  # Decoded by an ffmpeg process rather than OpenCV
+    FFMPEG_THREADS = 0  # Decoder threads for the ffmpeg decode mode (0 lets ffmpeg choose)
+    ASSUMED_GOP_SECONDS = 2.0
+    DEFAULT_ANALYSIS_SIZE = 320
+    SCORERS = ("flow", "histogram")
+    SELECTIONS = ("greedy", "top_k")
+    HISTOGRAM_BATCH_SIZE = 16
+    HISTOGRAM_CUT_DISTANCE = 0.4
+    HISTOGRAM_STATIC_DISTANCE = 0.05
+    DEFAULT_HASH_DISTANCE = 5
+    DUPLICATE_INTENSITY_DISTANCE = 16  # Grey levels; flat frames all hash to 0, so a cut between them differs only here
+    ADAPTIVE_COARSE_FACTOR = 6
+    ADAPTIVE_FLAT_SAMPLES = 3
+    DEFAULT_BLUR_RATIO = 0.3
+    SHARPNESS_HISTORY = 64  # Recent samples the blur reference is taken over
+    SHARPNESS_PERCENTILE = 90  # Reference for "sharp" in this video; robust to long blurred pans
+    SHARPNESS_WINDOW = 0.25  # Seconds either side searched for a sharp replacement
+    SEEK_ATTEMPTS = 4  # Back-offs before a timestamp seek gives up landing before its target
+    FRAME_BUFFER_BYTES = 128 * 1024 * 1024  # Full-resolution frames one job may hold while scoring
+    # Vision APIs downscale large images themselves (gpt-4o tiles at 768px
+    # on the short side, Google Vision recommends 640x480), so larger uploads
+    # only cost bandwidth
+    DEFAULT_API_IMAGE_SIZE = 768
+    DEFAULT_API_IMAGE_QUALITY = 85
+    
+    def __init__(self, video_path: Path, output_dir: Path, analysis_size: int = DEFAULT_ANALYSIS_SIZE,
+                 scorer: str = "flow", save_frames: bool = False, probe: Optional[VideoProbe] = None,
+                 feature_weights: Optional[Dict[str, float]] = None,
+                 api_image_size: int = DEFAULT_API_IMAGE_SIZE, api_image_quality: int = DEFAULT_API_IMAGE_QUALITY,
+                 keep_full_frames: bool = True, blur_ratio: float = DEFAULT_BLUR_RATIO):
+        """
+        Initialize frame extractor.
         
-        return len(faces) + len(bodies)
+        Args:
+            video_path: Path to video file
+            output_dir: Job output directory (frames go to output_dir/frames when saved)
+            analysis_size: Longest side in pixels of the copy used for scoring
+                (0 scores full-resolution frames)
+            scorer: "flow" scores every pair with absdiff and optical flow;
+                "histogram" decides clear cuts and static pairs from HSV
+                histogram distances and runs flow only on ambiguous pairs
+            save_frames: Also write selected frames to output_dir/frames for debugging
+            probe: Video properties from probe_video; probed on first use when omitted
+            feature_weights: Feature name -> weight for top_k ranking
+                (default ScoringEngine.DEFAULT_WEIGHTS)
+            api_image_size: Longest side in pixels of the JPEG uploaded to
+                vision APIs (FrameBundle.api_jpeg); 0 uploads the full frame
+            api_image_quality: JPEG quality (0-100) of the upload copy
+            keep_full_frames: Also keep the full-resolution JPEG; when False
+                FrameBundle.jpeg is the upload copy too
+            blur_ratio: Candidates less sharp than this fraction of the
+                SHARPNESS_PERCENTILE sharpness of recent samples are replaced
+                by the sharpest frame within SHARPNESS_WINDOW seconds, or
+                dropped if none is sharp enough (0 disables)
+        """
+        if scorer not in self.SCORERS:
+            raise ValueError(f"Unknown scorer: {scorer}")
+        self.video_path = video_path
+        self.probe = probe
+        self.analysis_size = analysis_size
+        self.scorer = scorer
+        self.output_dir = output_dir
+        self.frames_dir = output_dir / "frames"
+        self.save_frames = save_frames
+        if save_frames:
+            self.frames_dir.mkdir(parents=True, exist_ok=True)
+        self.scene_changes = []
+        self.motion_scores = []
+        self.frame_hashes = {}
+        self._frame_intensities: Dict[str, float] = {}
+        self.decode_mode = None
+        self.frames_sampled = 0
+        self.frames_decoded = 0
+        self._keyframes: Optional[List[int]] = None
+        self._packets: Optional[List[Tuple[float, bool]]] = None
+        self._last_saved_time = 0.0
+        self._resume_time = 0.0
+        self._min_hash_distance = self.DEFAULT_HASH_DISTANCE
+        self.blur_ratio = blur_ratio
+        self._sharpness_history = deque(maxlen=self.SHARPNESS_HISTORY)
+        self._neighbour_cap = None
+        self._ring: Optional[FrameRing] = None
+        self.frame_buffer_bytes = 0
+        self.peak_rss = 0
+        self.engine = ScoringEngine(feature_weights)
+        self.api_image_size = api_image_size
+        self.api_image_quality = api_image_quality
+        self.keep_full_frames = keep_full_frames
+    
+    def _get_probe(self) -> VideoProbe:
+        """Video properties, probed once per extractor unless passed in."""
+        if self.probe is None:
+            self.probe = probe_video(self.video_path)
+        return self.probe
+    
+    def _estimate_gop_length(self, fps: float) -> int:
+        """
+        Estimate the keyframe interval of the video in frames.
+        Uses the mean keyframe spacing read by _load_keyframes; a video with
+        a single keyframe is one GOP long. OpenCV does not expose the GOP
+        structure, so without ffprobe assume the ~2 second keyframe interval
+        used by social platforms.
+        """
+        keyframes = self._load_keyframes()
+        if len(keyframes) > 1:
+            return max(1, int(round((keyframes[-1] - keyframes[0]) / (len(keyframes) - 1))))
+        if keyframes:
+            return max(1, len(self._packets) - keyframes[0])
+        return max(1, int(round((fps if fps > 0 else 30.0) * self.ASSUMED_GOP_SECONDS)))
+    
+    def _load_keyframes(self) -> List[int]:
+        """
+        Frame numbers of the keyframes, read from the container with ffprobe
+        once per extractor (empty without ffprobe).
+        """
+        if self._keyframes is None:
+            self._keyframes = []
+            if shutil.which("ffprobe"):
+                try:
+                    packets = self._probe_packets()
+                except (OSError, subprocess.CalledProcessError, ValueError, KeyError, IndexError) as e:
+                    logger.debug(f"Could not read keyframes, assuming a fixed GOP: {e}")
+                else:
+                    self._keyframes = [index for index, (_, is_key) in enumerate(packets) if is_key]
+        return self._keyframes
+    
+    def _keyframe_before(self, frame_number: int, fps: float) -> int:
+        """
+        Frame number of the last keyframe at or before frame_number.
+        Without ffprobe a keyframe every estimated GOP is assumed.
+        """
+        if not self._load_keyframes():
+            gop_length = self._estimate_gop_length(fps)
+            return frame_number // gop_length * gop_length
+        index = bisect.bisect_right(self._keyframes, frame_number) - 1
+        return self._keyframes[index] if index >= 0 else 0
+    
+    def _seek_pays(self, position: int, frame_number: int, fps: float) -> bool:
+        """
+        Whether seeking to frame_number decodes fewer frames than grabbing
+        forward from position (the next frame the decoder returns). A seek
+        decodes from the previous keyframe, so it only pays when that
+        keyframe lies beyond position.
+        """
+        return frame_number > position and self._keyframe_before(frame_number, fps) > position
+    
+    def _seek(self, cap: cv2.VideoCapture, frame_number: int, fps: float):
+        """Seek cap so the next frame decoded is frame_number, counting the frames decoded to get there."""
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        self.frames_decoded += frame_number - self._keyframe_before(frame_number, fps)
+    
+    def _grab(self, cap: cv2.VideoCapture) -> bool:
+        """Decode the next frame without converting it, counting it as decoded."""
+        if not cap.grab():
+            return False
+        self.frames_decoded += 1
+        return True
     
-    def _is_frame_interesting(self, 
-                            frame: np.ndarray, 
-                            prev_frame: np.ndarray,
-                            frame_diff: float,
-                            motion_score: float,
-                            object_count: int,
-                            min_scene_change: float,
-                            min_motion_threshold: float) -> bool:
+    def _choose_decode_mode(self, frame_interval: int, fps: float, decode_mode: str) -> str:
         """
-        Determine if a frame is interesting based on multiple criteria.
+        Pick between seek and linear decoding.
+        A seek decodes forward from the previous keyframe, which costs about
+        half a GOP per sample; linear decoding costs one stride per sample.
         """
-        # Check for scene changes
-        is_scene_change = frame_diff > min_scene_change
+        if decode_mode not in self.DECODE_MODES:
+            raise ValueError(f"Unknown decode mode: {decode_mode}")
+        if decode_mode in self.PIPE_DECODE_MODES and not (shutil.which("ffmpeg") and shutil.which("ffprobe")):
+            logger.warning(f"ffmpeg/ffprobe not found, falling back from {decode_mode} decoding")
+            decode_mode = "auto"
+        if decode_mode != "auto":
+            return decode_mode
         
-        # Check for significant motion
-        has_motion = motion_score > min_motion_threshold
+        gop_length = self._estimate_gop_length(fps)
+        mode = "linear" if frame_interval <= gop_length // 2 + 1 else "seek"
+        logger.debug(f"Decode mode: {mode} (stride={frame_interval}, GOP={gop_length} frames)")
+        return mode
+    
+    def _iter_frames_seek(self, cap: cv2.VideoCapture, fps: float, frame_count: int, frame_interval: int):
+        """
+        Yield (frame_number, timestamp, frame) by seeking to every sampled frame.
+        Samples before the resume time are never sought to.
+        """
+        frame_number = 0
+        while frame_number < frame_count:
+            if frame_number / fps < self._resume_time:
+                resume_frame = int(np.ceil(self._resume_time * fps / frame_interval)) * frame_interval
+                frame_number = max(resume_frame, frame_number + frame_interval)
+                continue
+            self._seek(cap, frame_number, fps)
+            frame = self._read(cap)
+            if frame is None:
+                break
+            self.frames_sampled += 1
+            yield frame_number, self._capture_time(cap, fps), frame
+            frame_number += frame_interval
+    
+    def _iter_frames_linear(self, cap: cv2.VideoCapture, fps: float, frame_count: int, frame_interval: int,
+                            start_frame: int = 0):
+        """
+        Yield (frame_number, timestamp, frame) by decoding the stream in order.
+        Skipped frames are only grabbed; sampled frames are retrieved.
+        Decoding stops before frame_count and starts at start_frame, which
+        should sit on the sampling grid. When the spacing window after a save
+        reaches past the next keyframe, the decoder seeks over it; shorter
+        windows are grabbed through, which costs no more than the seek.
+        """
+        if start_frame > 0:
+            self._seek(cap, start_frame, fps)
+        frame_number = start_frame
+        while frame_number < frame_count:
+            # First grid frame at or after the resume time, minus float noise
+            resume_frame = int(np.ceil(self._resume_time * fps / frame_interval - 1e-6)) * frame_interval
+            if self._seek_pays(frame_number, resume_frame, fps):
+                self._seek(cap, resume_frame, fps)
+                frame_number = resume_frame
+                continue
+            if not self._grab(cap):
+                break
+            frame_number += 1
+            if (frame_number - 1) % frame_interval:
+                continue
+            timestamp = self._capture_time(cap, fps)
+            if timestamp < self._resume_time:
+                continue
+            frame = self._retrieve(cap)
+            if frame is None:
+                break
+            self.frames_sampled += 1
+            yield frame_number - 1, timestamp, frame
+    
+    @staticmethod
+    def _capture_time(cap: cv2.VideoCapture, fps: float) -> float:
+        """
+        Presentation time in seconds of the frame cap last grabbed.
+        Taken from the packet PTS, so it stays right on variable frame rate
+        phone recordings where frame_number / fps drifts; the frame index is
+        only used when the backend reports no timestamp.
+        """
+        msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+        index = cap.get(cv2.CAP_PROP_POS_FRAMES) - 1
+        if msec > 0 or index <= 0:
+            return max(msec, 0.0) / 1000.0
+        return index / fps
+    
+    def _read_frame_at_time(self, cap: cv2.VideoCapture, timestamp: float,
+                            fps: float) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Read the first frame at or after timestamp (seconds).
+        OpenCV maps seek targets through the nominal frame rate, which lands
+        early or late on variable frame rate video, so the seek backs off until
+        it lands at or before the target and decodes forward from there.
+        Returns (frame, presentation time), or None past the end of the stream.
+        """
+        tolerance = 0.5 / fps
+        backoff = 0.0
+        for _ in range(self.SEEK_ATTEMPTS):
+            target = max(timestamp - backoff, 0.0)
+            cap.set(cv2.CAP_PROP_POS_MSEC, target * 1000)
+            target_frame = int(round(target * fps))
+            self.frames_decoded += target_frame - self._keyframe_before(target_frame, fps)
+            position = self._capture_time(cap, fps) if self._grab(cap) else np.inf
+            if position <= timestamp + tolerance or timestamp - backoff <= 0:
+                break
+            backoff = max(2 * backoff, self.ASSUMED_GOP_SECONDS)
         
-        # Check for objects
-        has_objects = object_count > 0
+        while position < timestamp - tolerance:
+            if not self._grab(cap):
+                return None
+            position = self._capture_time(cap, fps)
+        if not np.isfinite(position):
+            return None
+        ret, frame = cap.retrieve()
+        return (frame, position) if ret else None
+    
+    def _probe_packet_times(self, keyframes_only: bool = False) -> List[float]:
+        """
+        Read video packet timestamps from the container, sorted into display
+        order so entry n is the time of frame n. Only packets are demuxed,
+        nothing is decoded.
+        """
+        return [timestamp for timestamp, is_key in self._probe_packets() if is_key or not keyframes_only]
+    
+    def _probe_packets(self) -> List[Tuple[float, bool]]:
+        """(timestamp, is keyframe) for every video packet, in display order; probed once per extractor."""
+        if self._packets is None:
+            self._packets = self._run_packet_probe()
+        return self._packets
+    
+    def _run_packet_probe(self) -> List[Tuple[float, bool]]:
+        """Run ffprobe for _probe_packets."""
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-select_streams", "v:0",
+                "-show_entries", "stream=start_pts,time_base:packet=pts,flags",
+                "-of", "json",
+                str(self.video_path)
+            ],
+            capture_output=True, text=True, check=True
+        )
+        probe = json.loads(result.stdout)
         
-        return is_scene_change or has_motion or has_objects
+        # Exact pts in time_base units; pts_time is rounded to microseconds
+        stream = probe["streams"][0]
+        time_base = Fraction(stream.get("time_base", "1/1"))
+        start_pts = int(stream.get("start_pts") or 0)
+        return sorted(
+            (float((int(packet["pts"]) - start_pts) * time_base), "K" in packet.get("flags", ""))
+            for packet in probe.get("packets", [])
+            if packet.get("pts") not in (None, "N/A")
+        )
+    
+    def _keyframe_interval(self) -> float:
+        """Longest gap in seconds between consecutive keyframes (0 with fewer than two)."""
+        keyframe_times = self._probe_packet_times(keyframes_only=True)
+        return max((b - a for a, b in zip(keyframe_times, keyframe_times[1:])), default=0.0)
+    
+    def _read_ffmpeg_frames(self, command: List[str], frame_shape: Tuple[int, ...]):
+        """Run ffmpeg writing raw frames to stdout and yield them as arrays (read into the frame ring when open)."""
+        frame_size = int(np.prod(frame_shape))
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            while True:
+                if self._ring is not None:
+                    frame = self._ring.read_stream(process.stdout)
+                    if frame is None:
+                        break
+                    yield frame
+                    continue
+                data = process.stdout.read(frame_size)
+                if len(data) < frame_size:
+                    break
+                yield np.frombuffer(data, dtype=np.uint8).reshape(frame_shape)
+        finally:
+            process.stdout.close()
+            process.kill()
+            process.wait()
+    
+    def _iter_frames_keyframes(self, fps: float):
+        """
+        Yield (frame_number, timestamp, frame) for keyframes only.
+        ffmpeg is told to skip decoding every non-key frame, so the work is
+        proportional to the number of GOPs rather than the number of frames.
+        """
+        width, height = self._get_probe().display_size
+        keyframe_times = self._probe_packet_times(keyframes_only=True)
+        command = [
+            "ffmpeg", "-v", "error", "-nostdin",
+            "-skip_frame", "nokey",
+            "-i", str(self.video_path),
+            "-map", "0:v:0",
+            "-vsync", "passthrough",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-"
+        ]
+        frames = self._read_ffmpeg_frames(command, (height, width, 3))
+        for timestamp, frame in zip(keyframe_times, frames):
+            self.frames_decoded += 1
+            if timestamp < self._resume_time:
+                continue
+            self.frames_sampled += 1
+            yield int(round(timestamp * fps)), timestamp, frame
+    
+    def _ffmpeg_plane_shape(self) -> Tuple[Tuple[int, ...], float]:
+        """
+        Shape of the planes the ffmpeg decode mode reads, and their
+        full-resolution/plane scale. The flow scorer only needs luma; the
+        histogram scorer needs colour.
+        """
+        (width, height), scale = _downscaled_size(self._get_probe().display_size[::-1], self.analysis_size)
+        shape = (height, width, 3) if self.scorer == "histogram" else (height, width)
+        return shape, 1.0 / scale
+    
+    def _iter_frames_ffmpeg(self, fps: float, frame_interval: int):
+        """
+        Yield (frame_number, timestamp, plane) decoded, sampled and scaled by ffmpeg.
+        ffmpeg keeps every frame_interval-th frame (the linear decoding grid)
+        and scales it to the analysis size on its own decoder threads, so
+        only analysis planes cross the pipe. Timestamps are the packet PTS
+        of the kept frames.
+        """
+        frame_times = self._probe_packet_times()
+        shape, _ = self._ffmpeg_plane_shape()
+        filters = [f"select='not(mod(n,{frame_interval}))'"]
+        if shape[:2] != self._get_probe().display_size[::-1]:
+            filters.append(f"scale={shape[1]}:{shape[0]}:flags=area")
+        command = [
+            "ffmpeg", "-v", "error", "-nostdin",
+            "-threads", str(self.FFMPEG_THREADS),
+            "-i", str(self.video_path),
+            "-map", "0:v:0",
+            "-vf", ",".join(filters),
+            "-vsync", "passthrough",
+            "-f", "rawvideo", "-pix_fmt", "bgr24" if len(shape) == 3 else "gray",
+            "-"
+        ]
+        for index, plane in enumerate(self._read_ffmpeg_frames(command, shape)):
+            # ffmpeg decodes every frame and drops the off-grid ones in its filter
+            self.frames_decoded += frame_interval
+            frame_number = index * frame_interval
+            timestamp = frame_times[frame_number] if frame_number < len(frame_times) else frame_number / fps
+            if timestamp < self._resume_time:
+                continue
+            self.frames_sampled += 1
+            yield frame_number, timestamp, plane
     
     def extract_frames(
         self,
         min_scene_change: float = 30.0,
         min_motion_threshold: float = 2.0,
         max_frames: int = 4,
-        frame_interval: int = 5
-    ) -> List[Path]:
-        """Extract key frames with optimized processing."""
-        cap = cv2.VideoCapture(str(self.video_path))
-        if not cap.isOpened():
-            raise ValueError(f"Could not open video: {self.video_path}")
+        frame_interval: int = 5,
+        decode_mode: str = "auto",
+        min_spacing: float = 2.0,
+        workers: int = 1,
+        min_hash_distance: int = DEFAULT_HASH_DISTANCE,
+        adaptive: bool = False,
+        selection: str = "greedy",
+        segmented: bool = False
+    ) -> List[FrameBundle]:
+        """Extract key frames with optimized processing. See iter_frames for the arguments."""
+        return list(self.iter_frames(
+            min_scene_change, min_motion_threshold, max_frames, frame_interval,
+            decode_mode, min_spacing, workers, min_hash_distance, adaptive, selection, segmented
+        ))
+    
+    def iter_frames(
+        self,
+        min_scene_change: float = 30.0,
+        min_motion_threshold: float = 2.0,
+        max_frames: int = 4,
+        frame_interval: int = 5,
+        decode_mode: str = "auto",
+        min_spacing: float = 2.0,
+        workers: int = 1,
+        min_hash_distance: int = DEFAULT_HASH_DISTANCE,
+        adaptive: bool = False,
+        selection: str = "greedy",
+        segmented: bool = False
+    ) -> Iterator[FrameBundle]:
+        """
+        Yield key frames as soon as they are selected.
         
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        Frames are scored against the previous sample as they are decoded
+        (in small batches for the histogram scorer), so no frame is left
+        unscored. After a save, samples closer than min_spacing are not
+        decoded at all; decoding resumes one stride before the window ends
+        so the first eligible frame has a predecessor. The parallel and
+        top_k paths only yield once every sample has been scored.
+        
+        Args:
+            min_scene_change: Minimum difference for scene change detection
+            min_motion_threshold: Minimum score for motion detection
+            max_frames: Maximum number of frames to extract
+            frame_interval: Sample every Nth frame
+            decode_mode: "seek", "linear", "keyframes" (I-frames only, needs ffmpeg),
+                "ffmpeg" (linear grid decoded and scaled by an ffmpeg process)
+                or "auto" (seek or linear, chosen from stride and GOP length)
+            min_spacing: Minimum time in seconds between saved frames
+            workers: Number of processes; more than one scores time segments
+                in parallel (see _extract_frames_segments)
+            min_hash_distance: Candidates whose perceptual hash is closer than
+                this many bits to an already saved frame are dropped (0 disables)
+            adaptive: Widen the stride while the video is static and return
+                to frame_interval around changes (greedy selection in seek and
+                linear modes only, see _iter_adaptive)
+            selection: "greedy" saves frames that pass the thresholds in time
+                order; "top_k" scores the whole video and keeps the max_frames
+                frames with the highest weighted feature score (see ScoringEngine)
+            segmented: Score every sample before selecting, as the parallel
+                path does, even with one worker; gives parallel runs a
+                sequential baseline with the same selection
+        """
+        if selection not in self.SELECTIONS:
+            raise ValueError(f"Unknown selection: {selection}")
+        self._min_hash_distance = min_hash_distance
+        self._sharpness_history.clear()
+        if workers > 1 or selection == "top_k" or segmented:
+            if decode_mode in self.PIPE_DECODE_MODES:
+                logger.warning(f"{decode_mode} decoding does not support parallel workers, segmented scoring "
+                               "or top_k selection, running greedy selection sequentially")
+            else:
+                yield from self._extract_frames_segments(
+                    min_scene_change, min_motion_threshold, max_frames, frame_interval, min_spacing,
+                    workers, selection == "top_k"
+                )
+                return
+        
+        probe = self._get_probe()
+        fps, frame_count = probe.fps, probe.frame_count
         saved_frames = []
-        prev_frame = None
-        last_saved_time = -2
-        frame_buffer = []
+        prev_record = None
+        self._last_saved_time = -min_spacing
+        self._resume_time = 0.0
+        
+        self.decode_mode = self._choose_decode_mode(frame_interval, fps, decode_mode)
+        adaptive = adaptive and self.decode_mode not in self.PIPE_DECODE_MODES
+        if self.decode_mode == "ffmpeg":
+            self._open_ring(self._batch_size(), self._ffmpeg_plane_shape()[0])
+        else:
+            # Adaptive sampling scores one sample at a time
+            self._open_ring(1 if adaptive else self._batch_size())
+        
+        # Keyframe and ffmpeg decoding read through an ffmpeg pipe and need no capture
+        cap = None
+        if self.decode_mode not in self.PIPE_DECODE_MODES:
+            cap = cv2.VideoCapture(str(self.video_path))
+            if not cap.isOpened():
+                raise ValueError(f"Could not open video: {self.video_path}")
+        if adaptive:
+            logger.info("Analyzing video for key frames (adaptive sampling)...")
+            try:
+                yield from self._iter_adaptive(
+                    cap, fps, frame_count, frame_interval, min_scene_change, min_motion_threshold,
+                    max_frames, min_spacing
+                )
+            finally:
+                cap.release()
+                self._release_neighbour_capture()
+                self._ring = None
+            logger.info(f"Extracted {len(self.motion_scores)} key frames from {self.frames_sampled} sampled frames")
+            logger.debug(f"Feature timings: {self.get_feature_timings()}")
+            logger.info(f"Frame extraction memory: {self.get_memory_usage()}")
+            return
+        
+        stride_seconds = frame_interval / fps
+        if self.decode_mode == "keyframes":
+            frames = self._iter_frames_keyframes(fps)
+            # Keyframes are a GOP apart, so resuming one stride early leaves the
+            # first keyframe after the spacing window without a predecessor
+            stride_seconds = max(stride_seconds, self._keyframe_interval())
+        elif self.decode_mode == "ffmpeg":
+            frames = self._iter_frames_ffmpeg(fps, frame_interval)
+        elif self.decode_mode == "linear":
+            frames = self._iter_frames_linear(cap, fps, frame_count, frame_interval)
+        else:
+            frames = self._iter_frames_seek(cap, fps, frame_count, frame_interval)
+        
+        logger.info(f"Analyzing video for key frames ({self.decode_mode} decoding)...")
         
-        logger.info("Analyzing video for key frames...")
+        try:
+            batch = []
+            for frame_number, timestamp, frame in frames:
+                if frame_number % 100 == 0:
+                    logger.info(f"Progress: {(frame_number / frame_count) * 100:.1f}%")
+                
+                # Scoring runs on a small copy shared by all scorers
+                batch.append(self._make_record(frame, timestamp, frame_number))
+                if len(batch) < self._batch_size():
+                    continue
+                
+                already_saved = len(saved_frames)
+                prev_record = self._select_from_batch(
+                    batch, prev_record, saved_frames, min_scene_change, min_motion_threshold,
+                    max_frames, min_spacing, stride_seconds
+                )
+                batch = []
+                yield from saved_frames[already_saved:]
+                if len(saved_frames) >= max_frames:
+                    break
+            
+            # Score the last partial batch
+            if batch and len(saved_frames) < max_frames:
+                already_saved = len(saved_frames)
+                self._select_from_batch(
+                    batch, prev_record, saved_frames, min_scene_change, min_motion_threshold,
+                    max_frames, min_spacing, stride_seconds
+                )
+                yield from saved_frames[already_saved:]
+        finally:
+            frames.close()
+            if cap is not None:
+                cap.release()
+            self._release_neighbour_capture()
+            self._ring = None
         
-        for frame_number in range(0, frame_count, frame_interval):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-            ret, frame = cap.read()
-            if not ret:
+        logger.info(f"Extracted {len(saved_frames)} key frames from {self.frames_sampled} sampled frames")
+        logger.debug(f"Feature timings: {self.get_feature_timings()}")
+        logger.info(f"Frame extraction memory: {self.get_memory_usage()}")
+    
+    def _read_frame_at(self, cap: cv2.VideoCapture, frame_number: int, position: int, fps: float) -> Optional[np.ndarray]:
+        """
+        Read one frame given the current decoder position. Seek decoding
+        seeks to every sample; linear decoding grabs forward unless the
+        target lies behind the decoder or past the next keyframe.
+        """
+        if self.decode_mode == "seek":
+            if frame_number != position:
+                self._seek(cap, frame_number, fps)
+        elif frame_number < position or self._seek_pays(position, frame_number, fps):
+            self._seek(cap, frame_number, fps)
+        else:
+            for _ in range(frame_number - position):
+                if not self._grab(cap):
+                    return None
+        return self._read(cap)
+    
+    def _iter_adaptive(
+        self,
+        cap: cv2.VideoCapture,
+        fps: float,
+        frame_count: int,
+        frame_interval: int,
+        min_scene_change: float,
+        min_motion_threshold: float,
+        max_frames: int,
+        min_spacing: float
+    ) -> Iterator[FrameBundle]:
+        """
+        Yield key frames while adapting the sampling stride to local activity.
+        
+        Sampling starts at frame_interval. After ADAPTIVE_FLAT_SAMPLES samples
+        in a row that the scorer rejects, the stride widens to
+        ADAPTIVE_COARSE_FACTOR * frame_interval. When a coarse step finds a
+        change, the gap is rescanned at frame_interval from the previous
+        sample so the saved frame sits on the cut rather than up to one
+        coarse step after it. Coarse steps and the spacing window seek when
+        they cross a keyframe (see _read_frame_at), so the frames they skip
+        are not decoded. Selection still goes through the usual thresholds
+        and spacing rule.
+        """
+        coarse_interval = frame_interval * self.ADAPTIVE_COARSE_FACTOR
+        saved_frames = []
+        prev_record = None
+        stride = frame_interval
+        flat_samples = 0
+        position = 0
+        frame_number = 0
+        
+        while frame_number < frame_count and len(saved_frames) < max_frames:
+            # Nothing inside the spacing window after a save is sampled
+            frame_number = max(frame_number, int(np.ceil(self._resume_time * fps)))
+            frame = self._read_frame_at(cap, frame_number, position, fps)
+            if frame is None:
                 break
+            position = frame_number + 1
+            self.frames_sampled += 1
             
-            timestamp = frame_number / fps
+            record = self._make_record(frame, self._capture_time(cap, fps), frame_number)
+            scores = self._score_batch([record], prev_record, min_scene_change, min_motion_threshold)
+            is_active = scores[0] is not None
             
-            # Skip if too close to last saved frame
-            if timestamp - last_saved_time < 2:
+            if is_active and stride > frame_interval:
+                # A change happened somewhere in the coarse step: rescan it densely
+                logger.debug(f"Change before {record.timestamp:.2f}s, rescanning at dense stride")
+                stride = frame_interval
+                flat_samples = 0
+                frame_number = prev_record.frame_number + stride
                 continue
             
-            # Buffer frames for batch processing
-            frame_buffer.append((frame, timestamp))
-            if len(frame_buffer) >= 10:  # Process in batches of 10
-                self._process_frame_batch(frame_buffer, saved_frames, min_scene_change, min_motion_threshold)
-                frame_buffer = []
+            already_saved = len(saved_frames)
+            prev_record = self._select_from_batch(
+                [record], prev_record, saved_frames, min_scene_change, min_motion_threshold,
+                max_frames, min_spacing, frame_interval / fps, scores
+            )
+            yield from saved_frames[already_saved:]
             
-            if len(saved_frames) >= max_frames:
-                break
+            flat_samples = 0 if is_active else flat_samples + 1
+            if flat_samples >= self.ADAPTIVE_FLAT_SAMPLES:
+                stride = coarse_interval
+            frame_number += stride
+    
+    async def aiter_frames(self, **kwargs) -> AsyncIterator[FrameBundle]:
+        """
+        Async form of iter_frames for use inside the bot's event loop.
+        Decoding runs in a worker thread and frames are handed over through
+        a queue, so consumers can start on early frames while later parts
+        of the video are still being decoded. When the consumer stops early,
+        fails or is cancelled, the worker thread stops at the next frame and
+        releases its captures.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        finished = object()
+        stop = threading.Event()
+        
+        def put(item):
+            if stop.is_set():
+                return
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # The consumer's loop closed while this frame was decoding
+                stop.set()
+        
+        def produce():
+            frames = self.iter_frames(**kwargs)
+            try:
+                for bundle in frames:
+                    if stop.is_set():
+                        break
+                    put(bundle)
+            except Exception as e:
+                put(e)
+            finally:
+                frames.close()
+                put(finished)
+        
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            await producer
+        finally:
+            stop.set()
+    
+    def _score_segment(
+        self,
+        start_frame: int,
+        end_frame: int,
+        frame_interval: int,
+        min_scene_change: float,
+        min_motion_threshold: float,
+        rank: bool = False
+    ) -> SegmentResult:
+        """
+        Score every sampled frame in [start_frame, end_frame) with its own capture.
+        Decoding starts one stride early so the first frame has a predecessor.
+        Frames that pass the thresholds become candidates; weighted scores
+        are only computed when rank is set and sharpness only when blur
+        rejection is on (see _mark_blurred).
+        """
+        cap = cv2.VideoCapture(str(self.video_path))
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video: {self.video_path}")
+        
+        fps = self._get_probe().fps
+        candidates = []
+        sharpness = {}
+        prev_record = None
+        self._open_ring(self._batch_size())
+        frames = self._iter_frames_linear(cap, fps, end_frame, frame_interval, max(0, start_frame - frame_interval))
+        batch = []
+        try:
+            for frame_number, timestamp, frame in frames:
+                batch.append(self._make_record(frame, timestamp, frame_number))
+                if len(batch) < self._batch_size():
+                    continue
+                prev_record = self._collect_candidates(
+                    batch, prev_record, candidates, sharpness, min_scene_change, min_motion_threshold, rank
+                )
+                batch = []
+            if batch:
+                self._collect_candidates(batch, prev_record, candidates, sharpness, min_scene_change,
+                                         min_motion_threshold, rank)
+        finally:
+            cap.release()
+            self._ring = None
+        return SegmentResult(candidates, self.frames_sampled, self.frames_decoded, self.get_feature_timings(),
+                             self.frame_buffer_bytes, self.peak_rss, sharpness)
+    
+    def _collect_candidates(
+        self,
+        records: List[FrameRecord],
+        prev_record: Optional[FrameRecord],
+        candidates: List[SegmentCandidate],
+        sharpness: Dict[int, float],
+        min_scene_change: float,
+        min_motion_threshold: float,
+        rank: bool = False
+    ) -> FrameRecord:
+        """
+        Score a batch, append the frames that pass the thresholds to
+        candidates and record every frame's sharpness.
+        """
+        scores = self._score_batch(records, prev_record, min_scene_change, min_motion_threshold, rank)
+        for record, score in zip(records, scores):
+            if "sharpness" in record.features:
+                sharpness[record.frame_number] = float(record.features["sharpness"])
+            if score is not None:
+                is_scene_change, motion_score, weighted_score = score
+                candidates.append(SegmentCandidate(
+                    record.frame_number, record.timestamp, is_scene_change, motion_score, record.dhash,
+                    record.mean_intensity, weighted_score, sharpness.get(record.frame_number, 0.0)
+                ))
+        return records[-1]
+    
+    def _mark_blurred(
+        self,
+        candidates: List[SegmentCandidate],
+        sharpness: Dict[int, float]
+    ) -> List[SegmentCandidate]:
+        """
+        Set each candidate's blur_floor when it is less sharp than the floor,
+        leaving 0 when it is sharp enough. The reference is the SHARPNESS_HISTORY samples of
+        the whole video up to and including the candidate, taken after the
+        segments are merged, so it does not depend on how the video was
+        split between workers.
+        """
+        if not self.blur_ratio or not sharpness:
+            return candidates
+        
+        frame_numbers = sorted(sharpness)
+        values = [sharpness[frame_number] for frame_number in frame_numbers]
+        positions = {frame_number: index for index, frame_number in enumerate(frame_numbers)}
+        marked = []
+        for candidate in candidates:
+            end = positions[candidate.frame_number] + 1
+            history = values[max(0, end - self.SHARPNESS_HISTORY):end]
+            blur_floor = self.blur_ratio * float(np.percentile(history, self.SHARPNESS_PERCENTILE))
+            if candidate.sharpness < blur_floor:
+                candidate = candidate._replace(blur_floor=blur_floor)
+            marked.append(candidate)
+        return marked
+    
+    def _extract_frames_segments(
+        self,
+        min_scene_change: float,
+        min_motion_threshold: float,
+        max_frames: int,
+        frame_interval: int,
+        min_spacing: float,
+        workers: int,
+        rank: bool
+    ) -> List[FrameBundle]:
+        """
+        Extract key frames by scoring every sample, then selecting from the candidates.
+        
+        With several workers, time segments are scored in separate processes.
+        Every sample is scored against the sample before it, including across
+        segment boundaries, and one pass over the merged candidates applies
+        the blur floor (see _mark_blurred), the spacing rule and max_frames,
+        so the selection does not depend on the number of workers. It can differ from the greedy sequential path,
+        which skips samples inside the spacing window.
+        """
+        frame_count = self._get_probe().frame_count
+        self.decode_mode = "linear"
+        candidates = []
+        if workers > 1:
+            # Split the sampling grid into contiguous segments
+            grid = range(0, frame_count, frame_interval)
+            bounds = sorted({grid[len(grid) * i // workers] for i in range(workers)}) if grid else []
+            bounds.append(frame_count)
+            segments = list(zip(bounds[:-1], bounds[1:]))
+            
+            logger.info(f"Analyzing video for key frames ({len(segments)} segments, {workers} workers)...")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(
+                        _score_segment_worker, self.video_path, self.output_dir, self.analysis_size, self.scorer,
+                        self.probe, self.engine.weights, self.blur_ratio, start, end, frame_interval,
+                        min_scene_change, min_motion_threshold, rank
+                    )
+                    for start, end in segments
+                ]
+                results = [future.result() for future in futures]
             
-            if frame_number % 100 == 0:
-                logger.info(f"Progress: {(frame_number / frame_count) * 100:.1f}%")
+            sharpness = {}
+            for result in results:
+                candidates.extend(result.candidates)
+                sharpness.update(result.sharpness)
+                self.frames_sampled += result.frames_sampled
+                self.frames_decoded += result.frames_decoded
+                self.engine.merge_timings(result.feature_timings)
+            
+            # Segments run at the same time, one per worker, so their memory adds up
+            self.frame_buffer_bytes = sum(result.frame_buffer_bytes for result in results)
+            self._sample_memory()
+            self.peak_rss += sum(result.peak_rss for result in results)
+        else:
+            logger.info("Analyzing video for key frames (top_k selection)...")
+            result = self._score_segment(0, frame_count, frame_interval, min_scene_change, min_motion_threshold, rank)
+            candidates, sharpness = result.candidates, result.sharpness
+        candidates = self._mark_blurred(candidates, sharpness)
         
-        # Process remaining frames
-        if frame_buffer:
-            self._process_frame_batch(frame_buffer, saved_frames, min_scene_change, min_motion_threshold)
+        cap = cv2.VideoCapture(str(self.video_path))
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video: {self.video_path}")
+        try:
+            selected = self._pick_candidates(candidates, cap, max_frames, min_spacing, rank)
+        finally:
+            cap.release()
+        saved_frames = [
+            self._save_frame(record, is_scene_change, motion_score)
+            for record, is_scene_change, motion_score in selected
+        ]
         
-        cap.release()
-        logger.info(f"Extracted {len(saved_frames)} key frames")
+        logger.info(f"Extracted {len(saved_frames)} key frames from {self.frames_sampled} sampled frames")
+        logger.debug(f"Feature timings: {self.get_feature_timings()}")
+        logger.info(f"Frame extraction memory: {self.get_memory_usage()}")
         return saved_frames
-
-    def _process_frame_batch(
+    
+    def _pick_candidates(
         self,
-        frame_buffer: List[Tuple[np.ndarray, float]],
-        saved_frames: List[Path],
+        candidates: List[SegmentCandidate],
+        cap: cv2.VideoCapture,
+        max_frames: int,
+        min_spacing: float,
+        rank: bool
+    ) -> List[Tuple[FrameRecord, bool, float]]:
+        """
+        Apply max_frames, the spacing rule, the duplicate check and blur
+        replacement to scored candidates, reading the picked frames from cap.
+        Candidates are taken in time order, or by descending weighted score
+        when rank is set (top_k). Returns (record, is_scene_change,
+        motion_score) for the picked frames in time order.
+        """
+        if rank:
+            order = sorted(candidates, key=lambda candidate: (-candidate.weighted_score, candidate.timestamp))
+        else:
+            order = sorted(candidates)
+        
+        selected = []
+        for candidate in order:
+            if len(selected) >= max_frames:
+                break
+            picked_times = [record.timestamp for record, _, _ in selected]
+            if any(abs(candidate.timestamp - picked) < min_spacing for picked in picked_times):
+                continue
+            if any(self._matches(candidate.dhash, candidate.mean_intensity, record.dhash, record.mean_intensity)
+                   for record, _, _ in selected):
+                continue
+            
+            # Re-read by time: on variable frame rate video a frame-number seek lands elsewhere
+            read = self._read_frame_at_time(cap, candidate.timestamp, self._get_probe().fps)
+            if read is None:
+                logger.warning(f"Could not read selected frame at {candidate.timestamp:.2f}s")
+                continue
+            record = FrameRecord(read[0], read[1], candidate.frame_number, self.analysis_size)
+            
+            if candidate.blur_floor:
+                earliest = max((t for t in picked_times if t < candidate.timestamp), default=-np.inf) + min_spacing
+                latest = min((t for t in picked_times if t > candidate.timestamp), default=np.inf) - min_spacing
+                record = self._replace_blurred(cap, record, candidate.blur_floor, earliest, latest)
+                if record is None:
+                    continue
+                if any(self._matches(record.dhash, record.mean_intensity, saved.dhash, saved.mean_intensity)
+                       for saved, _, _ in selected):
+                    continue
+            selected.append((record, candidate.is_scene_change, candidate.motion_score))
+        
+        return sorted(selected, key=lambda item: item[0].timestamp)
+    
+    def _blur_floor(self) -> float:
+        """Sharpness below which a candidate counts as blurred (0 when blur rejection is off)."""
+        if not self.blur_ratio or not self._sharpness_history:
+            return 0.0
+        return self.blur_ratio * float(np.percentile(self._sharpness_history, self.SHARPNESS_PERCENTILE))
+    
+    def _replace_blurred(
+        self,
+        cap: cv2.VideoCapture,
+        record: FrameRecord,
+        min_sharpness: float,
+        earliest: float,
+        latest: float = np.inf
+    ) -> Optional[FrameRecord]:
+        """
+        Swap a blurred candidate for the sharpest frame within SHARPNESS_WINDOW
+        seconds of it, keeping inside [earliest, latest] so the spacing rule
+        still holds. Returns None when no frame reaches min_sharpness.
+        """
+        fps = self._get_probe().fps
+        start = max(record.timestamp - self.SHARPNESS_WINDOW, earliest, 0.0)
+        end = min(record.timestamp + self.SHARPNESS_WINDOW, latest)
+        tolerance = 0.5 / fps
+        
+        best, best_sharpness = None, min_sharpness
+        read = self._read_frame_at_time(cap, start, fps) if start <= end else None
+        if read is not None:
+            frame, timestamp = read
+            frame_number = record.frame_number + int(round((timestamp - record.timestamp) * fps))
+            while timestamp <= end + tolerance:
+                if abs(timestamp - record.timestamp) > tolerance:
+                    # Only the best neighbour keeps its full-resolution frame
+                    neighbour = FrameRecord(frame, timestamp, frame_number, self.analysis_size)
+                    sharpness = self.engine.compute("sharpness", [neighbour], [None], [0], {})[0]
+                    if sharpness >= best_sharpness:
+                        best, best_sharpness = neighbour, sharpness
+                if not self._grab(cap):
+                    break
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                timestamp = self._capture_time(cap, fps)
+                frame_number += 1
+        
+        if best is None:
+            logger.debug(f"Skipping blurred frame at {record.timestamp:.2f}s, no sharp frame nearby")
+        else:
+            logger.debug(f"Replacing blurred frame at {record.timestamp:.2f}s with {best.timestamp:.2f}s")
+        return best
+    
+    def _get_neighbour_capture(self) -> cv2.VideoCapture:
+        """Second capture for blur replacement, so the decoding capture keeps its position."""
+        if self._neighbour_cap is None:
+            self._neighbour_cap = cv2.VideoCapture(str(self.video_path))
+        return self._neighbour_cap
+    
+    def _release_neighbour_capture(self):
+        """Release the blur-replacement capture if one was opened."""
+        if self._neighbour_cap is not None:
+            self._neighbour_cap.release()
+            self._neighbour_cap = None
+    
+    def _batch_size(self) -> int:
+        """
+        Number of sampled frames scored together. Histogram batches shrink
+        when HISTOGRAM_BATCH_SIZE full-resolution frames would not fit in
+        FRAME_BUFFER_BYTES, e.g. for 4K video.
+        """
+        if self.scorer != "histogram":
+            return 1
+        width, height = self._get_probe().display_size
+        frames_in_budget = self.FRAME_BUFFER_BYTES // max(1, width * height * 3)
+        return int(min(self.HISTOGRAM_BATCH_SIZE, max(1, frames_in_budget)))
+    
+    def _open_ring(self, batch: int, frame_shape: Optional[Tuple[int, ...]] = None) -> FrameRing:
+        """
+        Allocate the frame ring for one decoding pass. Selected frames are
+        encoded before the next batch is decoded, so only the scoring batch
+        needs full frames; planes are also kept for the previous record and
+        for the sample an adaptive rescan discards. frame_shape defaults to
+        full-resolution BGR; the ffmpeg decode mode reads analysis planes.
+        """
+        if frame_shape is None:
+            width, height = self._get_probe().display_size
+            frame_shape = (height, width, 3)
+        self._ring = FrameRing(batch, 2, frame_shape, self.analysis_size)
+        self.frame_buffer_bytes = max(self.frame_buffer_bytes, self._ring.nbytes)
+        return self._ring
+    
+    def _read(self, cap: cv2.VideoCapture) -> Optional[np.ndarray]:
+        """Decode the next frame, into the frame ring when one is open."""
+        self.frames_decoded += 1
+        if self._ring is not None:
+            return self._ring.read(cap)
+        ret, frame = cap.read()
+        return frame if ret else None
+    
+    def _retrieve(self, cap: cv2.VideoCapture) -> Optional[np.ndarray]:
+        """Retrieve the grabbed frame, into the frame ring when one is open."""
+        if self._ring is not None:
+            return self._ring.retrieve(cap)
+        ret, frame = cap.retrieve()
+        return frame if ret else None
+    
+    def _make_record(self, frame: np.ndarray, timestamp: float, frame_number: int) -> FrameRecord:
+        """FrameRecord for a frame just decoded, reusing the ring's analysis planes when one is open."""
+        if self.decode_mode == "ffmpeg":
+            return FrameRecord.from_analysis_plane(frame, timestamp, frame_number, self._ffmpeg_plane_shape()[1])
+        if self._ring is not None:
+            return self._ring.record(frame, timestamp, frame_number)
+        return FrameRecord(frame, timestamp, frame_number, self.analysis_size)
+    
+    def _sample_memory(self):
+        """Update the peak resident memory seen while this extractor runs."""
+        self.peak_rss = max(self.peak_rss, psutil.Process().memory_info().rss)
+    
+    def _score_batch(
+        self,
+        records: List[FrameRecord],
+        prev_record: Optional[FrameRecord],
         min_scene_change: float,
-        min_motion_threshold: float
-    ):
-        """Process a batch of frames efficiently."""
-        for i, (frame, timestamp) in enumerate(frame_buffer):
-            if i > 0:
-                prev_frame = frame_buffer[i-1][0]
-                frame_diff = self._compute_frame_difference(frame, prev_frame)
-                motion_score = self._detect_motion(frame, prev_frame)
-                
-                if frame_diff > min_scene_change or motion_score > min_motion_threshold:
-                    frame_path = self.frames_dir / f"frame_{timestamp:.2f}s.jpg"
-                    cv2.imwrite(str(frame_path), frame)
-                    saved_frames.append(frame_path)
-                    
-                    if frame_diff > min_scene_change:
-                        self.scene_changes.append(frame_path)
-                    self.motion_scores.append((frame_path, motion_score))
-                    
-                    logger.info(f"Saved frame at {timestamp:.2f}s (scene_change={frame_diff > min_scene_change}, "
-                              f"motion={motion_score:.2f}")
-    
-    def get_scene_changes(self) -> List[Path]:
+        min_motion_threshold: float,
+        rank: bool = False
+    ) -> List[Optional[Tuple[bool, float, float]]]:
+        """
+        Score each record against the one before it.
+        Returns (is_scene_change, motion_score, weighted_score) for frames
+        that pass the thresholds and None for the rest, including a first
+        frame with no predecessor. The weighted score is 0 unless rank is set.
+        """
+        previous = [prev_record] + records[:-1]
+        paired = [index for index, record in enumerate(previous) if record is not None]
+        values: Dict[str, np.ndarray] = {}
+        passed: Dict[int, Tuple[bool, float]] = {}
+        self._sample_memory()
+        
+        if self.blur_ratio:
+            # Sharpness of every sample feeds the reference for blur rejection
+            sharpness = self.engine.compute("sharpness", records, previous, list(range(len(records))), values)
+            self._sharpness_history.extend(sharpness.tolist())
+        
+        ambiguous = paired
+        if self.scorer == "histogram":
+            # Clear cuts and static pairs are decided without optical flow
+            distances = self.engine.compute("histogram", records, previous, paired, values)
+            ambiguous = []
+            for index in paired:
+                if distances[index] > self.HISTOGRAM_CUT_DISTANCE:
+                    passed[index] = (True, 0.0)
+                elif distances[index] >= self.HISTOGRAM_STATIC_DISTANCE:
+                    ambiguous.append(index)
+        
+        frame_diffs = self.engine.compute("absdiff", records, previous, ambiguous, values)
+        motion_scores = self.engine.compute("flow", records, previous, ambiguous, values)
+        for index in ambiguous:
+            is_scene_change = bool(frame_diffs[index] > min_scene_change)
+            if is_scene_change or motion_scores[index] > min_motion_threshold:
+                passed[index] = (is_scene_change, float(motion_scores[index]))
+        
+        if rank and passed:
+            weighted = self.engine.score(records, previous, sorted(passed), values)
+        else:
+            weighted = np.zeros(len(records))
+        return [
+            passed[index] + (float(weighted[index]),) if index in passed else None
+            for index in range(len(records))
+        ]
+    
+    def _select_from_batch(
+        self,
+        records: List[FrameRecord],
+        prev_record: Optional[FrameRecord],
+        saved_frames: List[FrameBundle],
+        min_scene_change: float,
+        min_motion_threshold: float,
+        max_frames: int,
+        min_spacing: float,
+        stride_seconds: float,
+        scores: Optional[List[Optional[Tuple[bool, float, float]]]] = None
+    ) -> Optional[FrameRecord]:
+        """
+        Score a batch, save the frames that pass and respect the spacing rule.
+        Scores already computed with _score_batch can be passed in.
+        Returns the record to compare the next decoded frame against, or None
+        when decoding will skip ahead past the spacing window.
+        """
+        if scores is None:
+            scores = self._score_batch(records, prev_record, min_scene_change, min_motion_threshold)
+        for record, score in zip(records, scores):
+            if score is None or record.timestamp - self._last_saved_time < min_spacing:
+                continue
+            blur_floor = self._blur_floor()
+            if record.features.get("sharpness", blur_floor) < blur_floor:
+                record = self._replace_blurred(self._get_neighbour_capture(), record, blur_floor,
+                                               self._last_saved_time + min_spacing)
+                if record is None:
+                    continue
+            if self._is_duplicate(record):
+                logger.debug(f"Skipping near-duplicate frame at {record.timestamp:.2f}s")
+                continue
+            
+            is_scene_change, motion_score, _ = score
+            saved_frames.append(self._save_frame(record, is_scene_change, motion_score))
+            if len(saved_frames) >= max_frames:
+                break
+            
+            # Skip decoding inside the spacing window
+            self._last_saved_time = record.timestamp
+            self._resume_time = record.timestamp + min_spacing - stride_seconds
+        
+        last_record = records[-1]
+        return last_record if last_record.timestamp >= self._resume_time else None
+    
+    def _matches(self, hash_a: int, intensity_a: float, hash_b: int, intensity_b: float) -> bool:
+        """
+        Check whether two frames look the same: hashes within min_hash_distance
+        and mean intensities within DUPLICATE_INTENSITY_DISTANCE.
+        
+        dHash only sees gradients, so every flat frame hashes to 0 and a cut
+        from black to white would otherwise count as a duplicate.
+        """
+        return (hamming_distance(hash_a, hash_b) < self._min_hash_distance
+                and abs(intensity_a - intensity_b) < self.DUPLICATE_INTENSITY_DISTANCE)
+    
+    def _is_duplicate(self, record: FrameRecord) -> bool:
+        """Check whether a frame looks the same as an already saved frame."""
+        return any(
+            self._matches(record.dhash, record.mean_intensity, int(saved_hash, 16), self._frame_intensities[name])
+            for name, saved_hash in self.frame_hashes.items()
+        )
+    
+    def _save_frame(self, record: FrameRecord, is_scene_change: bool, motion_score: float) -> FrameBundle:
+        """Encode a selected frame and record its scores and perceptual hash."""
+        if record.frame is None:
+            # Frames decoded at analysis size are read back at full resolution only when saved
+            read = self._read_frame_at_time(self._get_neighbour_capture(), record.timestamp, self._get_probe().fps)
+            if read is None:
+                raise ValueError(f"Could not read frame at {record.timestamp:.2f}s")
+            record.frame = read[0]
+        api_jpeg = self._encode_api_image(record) if self.api_image_size else None
+        if api_jpeg is None or self.keep_full_frames:
+            success, encoded = cv2.imencode(".jpg", record.frame)
+            if not success:
+                raise ValueError(f"Could not encode frame at {record.timestamp:.2f}s")
+            jpeg = encoded.tobytes()
+        else:
+            jpeg = api_jpeg
+        
+        bundle = FrameBundle(jpeg, record.timestamp, float(motion_score), is_scene_change,
+                             f"{record.dhash:016x}", api_jpeg=api_jpeg)
+        if self.save_frames:
+            bundle.path = self.frames_dir / bundle.name
+            bundle.path.write_bytes(bundle.jpeg)
+        self.frame_hashes[bundle.name] = bundle.frame_hash
+        self._frame_intensities[bundle.name] = record.mean_intensity
+        
+        if is_scene_change:
+            self.scene_changes.append(bundle)
+        self.motion_scores.append((bundle, bundle.motion_score))
+        
+        logger.info(f"Saved frame at {record.timestamp:.2f}s (scene_change={is_scene_change}, "
+                  f"motion={motion_score:.2f}")
+        return bundle
+    
+    def _encode_api_image(self, record: FrameRecord) -> bytes:
+        """JPEG of the frame downscaled to api_image_size at api_image_quality, for vision API uploads."""
+        small, _ = downscale_frame(record.frame, self.api_image_size)
+        success, encoded = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, self.api_image_quality])
+        if not success:
+            raise ValueError(f"Could not encode frame at {record.timestamp:.2f}s")
+        return encoded.tobytes()
+    
+    def get_scene_changes(self) -> List[FrameBundle]:
         """Get list of frames where scene changes were detected."""
         return self.scene_changes
     
-    def get_motion_scores(self) -> List[Tuple[Path, float]]:
+    def get_motion_scores(self) -> List[Tuple[FrameBundle, float]]:
         """Get motion scores for saved frames."""
         return self.motion_scores
+    
+    def get_frame_hashes(self) -> Dict[str, str]:
+        """Get perceptual hashes (16 hex digits) of saved frames by frame name."""
+        return self.frame_hashes
+    
+    def get_feature_timings(self) -> Dict[str, Dict[str, float]]:
+        """Get time spent per scoring feature (see ScoringEngine.timings)."""
+        return self.engine.timings()
+    
+    def get_memory_usage(self) -> Dict[str, float]:
+        """
+        Get the memory this extraction needed: the preallocated frame buffers
+        (what the job itself holds, about FRAME_BUFFER_BYTES at most per
+        process) and the peak process RSS sampled while scoring,
+        which includes anything else the process was doing at the time.
+        """
+        return {
+            "frame_buffers_mb": round(self.frame_buffer_bytes / (1024 * 1024), 1),
+            "peak_rss_mb": round(self.peak_rss / (1024 * 1024), 1)
+        }
+
+def _score_segment_worker(
+    video_path: Path,
+    output_dir: Path,
+    analysis_size: int,
+    scorer: str,
+    probe: VideoProbe,
+    feature_weights: Dict[str, float],
+    blur_ratio: float,
+    start_frame: int,
+    end_frame: int,
+    frame_interval: int,
+    min_scene_change: float,
+    min_motion_threshold: float,
+    rank: bool
+) -> SegmentResult:
+    """Process pool entry point for FrameExtractor._score_segment."""
+    # Each process gets one core; avoid oversubscribing with OpenCV's own threads
+    cv2.setNumThreads(1)
+    extractor = FrameExtractor(video_path, output_dir, analysis_size=analysis_size, scorer=scorer, probe=probe,
+                               feature_weights=feature_weights, blur_ratio=blur_ratio)
+    return extractor._score_segment(start_frame, end_frame, frame_interval, min_scene_change,
+                                    min_motion_threshold, rank)
+
+class FrameCache:
+    """
+    Persistent, size-bounded cache of Step 2 results.
+    Entries are keyed by a content hash of the video plus the extraction
+    parameters, so the same clip submitted again skips decoding entirely.
+    Each entry is a directory holding the frame JPEGs and a manifest; the
+    manifest's modification time is the LRU clock.
+    """
+    
+    VERSION = 8  # Bump when frame selection changes so old entries stop matching
+    
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        """
+        Initialize frame cache.
+        
+        Args:
+            cache_dir: Directory holding cache entries
+            max_bytes: Total size above which least recently used entries are evicted
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    @staticmethod
+    def hash_file(video_file: Path) -> str:
+        """Content hash of a video file (BLAKE2b, read in 1 MiB chunks)."""
+        digest = hashlib.blake2b(digest_size=20)
+        with open(video_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def make_key(self, video_file: Path, params: dict) -> str:
+        """Cache key for a video and the parameters it is extracted with."""
+        encoded_params = json.dumps({"version": self.VERSION, **params}, sort_keys=True)
+        return hashlib.blake2b(
+            f"{self.hash_file(video_file)}:{encoded_params}".encode(), digest_size=20
+        ).hexdigest()
+    
+    def get(self, key: str) -> Optional[Tuple[List[FrameBundle], float]]:
+        """Return (frames, duration) for a cached entry, or None on a miss."""
+        manifest_file = self.cache_dir / key / "manifest.json"
+        try:
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            frames = [
+                FrameBundle(
+                    (self.cache_dir / key / entry["file"]).read_bytes(),
+                    entry["timestamp"],
+                    entry["motion_score"],
+                    entry["is_scene_change"],
+                    entry["frame_hash"],
+                    api_jpeg=(self.cache_dir / key / entry["api_file"]).read_bytes() if "api_file" in entry else None
+                )
+                for entry in manifest["frames"]
+            ]
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        
+        os.utime(manifest_file)  # Mark as recently used
+        self.hits += 1
+        return frames, manifest["duration"]
+    
+    def put(self, key: str, frames: List[FrameBundle], duration: float):
+        """Store an entry and evict least recently used entries over the size limit."""
+        entry_dir = self.cache_dir / key
+        if entry_dir.exists():
+            return
+        
+        # Build the entry next to the cache and rename it into place, so a
+        # concurrent job never sees a half-written entry
+        temp_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp_"))
+        try:
+            manifest = {"duration": float(duration), "frames": []}
+            for index, frame in enumerate(frames):
+                file_name = f"{index:03d}.jpg"
+                (temp_dir / file_name).write_bytes(frame.jpeg)
+                entry = {
+                    "file": file_name,
+                    "timestamp": float(frame.timestamp),
+                    "motion_score": float(frame.motion_score),
+                    "is_scene_change": bool(frame.is_scene_change),
+                    "frame_hash": frame.frame_hash
+                }
+                if frame.api_jpeg is not frame.jpeg:
+                    entry["api_file"] = f"{index:03d}_api.jpg"
+                    (temp_dir / entry["api_file"]).write_bytes(frame.api_jpeg)
+                manifest["frames"].append(entry)
+            with open(temp_dir / "manifest.json", 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            temp_dir.rename(entry_dir)
+        except (OSError, TypeError) as e:
+            logger.warning(f"Could not write frame cache entry: {str(e)}")
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return
+        
+        self._evict()
+    
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total_bytes = 0
+        for entry_dir in self.cache_dir.iterdir():
+            manifest_file = entry_dir / "manifest.json"
+            if entry_dir.name.startswith(".") or not manifest_file.exists():
+                continue
+            size = sum(f.stat().st_size for f in entry_dir.iterdir())
+            entries.append((manifest_file.stat().st_mtime, size, entry_dir))
+            total_bytes += size
+        
+        for _, size, entry_dir in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_bytes -= size
+            logger.debug(f"Evicted frame cache entry {entry_dir.name}")
+    
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters since this cache object was created."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+_frame_cache = None
+
+def get_frame_cache() -> FrameCache:
+    """
+    Shared frame cache for the process, configured from the environment:
+    FRAME_CACHE_DIR (default cache/frames) and FRAME_CACHE_MAX_MB (default 500).
+    """
+    global _frame_cache
+    if _frame_cache is None:
+        _frame_cache = FrameCache(
+            Path(os.getenv("FRAME_CACHE_DIR", "cache/frames")),
+            int(os.getenv("FRAME_CACHE_MAX_MB", "500")) * 1024 * 1024
+        )
+    return _frame_cache
+
+def _load_metadata(output_dir: Path) -> dict:
+    """Load the video metadata saved by Step 1, if any."""
+    metadata = {}
+    metadata_file = output_dir / "video_metadata.json"
+    if metadata_file.exists():
+        try:
+            with open(metadata_file, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            logger.debug("Loaded video metadata")
+        except Exception as e:
+            logger.warning(f"Error loading metadata: {str(e)}")
+    return metadata
+
+def _restore_cached_frames(frames: List[FrameBundle], output_dir: Path,
+                           save_frames: bool) -> Tuple[List[FrameBundle], List[Tuple[FrameBundle, float]], dict]:
+    """Rebuild the Step 2 outputs for frames served from the cache."""
+    if save_frames:
+        frames_dir = output_dir / "frames"
+        frames_dir.mkdir(parents=True, exist_ok=True)
+        for frame in frames:
+            frame.path = frames_dir / frame.name
+            frame.path.write_bytes(frame.jpeg)
+    
+    scene_changes = [frame for frame in frames if frame.is_scene_change]
+    motion_scores = [(frame, frame.motion_score) for frame in frames]
+    frame_hashes = {frame.name: frame.frame_hash for frame in frames}
+    return scene_changes, motion_scores, frame_hashes
 
 def execute_step(
     video_file: Path,
     output_dir: Path,
     min_scene_change: float = 30.0,
     min_motion_threshold: float = 2.0,
-    max_frames: int = 4  # Reduced from default
-) -> Tuple[List[Path], List[Path], List[Tuple[Path, float]], float, dict]:
+    max_frames: int = 4,  # Reduced from default
+    decode_mode: str = "auto",
+    analysis_size: int = FrameExtractor.DEFAULT_ANALYSIS_SIZE,
+    workers: int = 1,
+    scorer: str = "flow",
+    min_hash_distance: int = FrameExtractor.DEFAULT_HASH_DISTANCE,
+    save_frames: bool = False,
+    adaptive: bool = True,
+    use_cache: bool = True,
+    probe: Optional[VideoProbe] = None,
+    selection: str = "greedy",
+    feature_weights: Optional[Dict[str, float]] = None,
+    blur_ratio: float = FrameExtractor.DEFAULT_BLUR_RATIO,
+    api_image_size: int = FrameExtractor.DEFAULT_API_IMAGE_SIZE,
+    api_image_quality: int = FrameExtractor.DEFAULT_API_IMAGE_QUALITY,
+    keep_full_frames: bool = True
+) -> Tuple[List[FrameBundle], List[FrameBundle], List[Tuple[FrameBundle, float]], float, dict]:
     """
     Execute frame extraction step.
     
     Args:
         video_file: Path to video file
-        output_dir: Directory to save frames
+        output_dir: Job output directory (frames go to output_dir/frames when saved)
         min_scene_change: Minimum difference for scene change detection
         min_motion_threshold: Minimum score for motion detection
         max_frames: Maximum number of frames to extract
+        decode_mode: Frame decoding strategy ("auto", "seek", "linear", "keyframes" or "ffmpeg")
+        analysis_size: Longest side in pixels used for scoring (0 for full resolution)
+        workers: Number of processes scoring time segments in parallel
+        scorer: Frame scorer ("flow" or "histogram")
+        min_hash_distance: Minimum perceptual-hash distance in bits between saved frames
+        save_frames: Also write the selected frames to output_dir/frames for debugging
+        adaptive: Sample static stretches at a coarser stride
+        use_cache: Serve repeated videos from the shared frame cache (see get_frame_cache)
+        probe: Video properties from probe_video, when the caller already has them
+        selection: "greedy" (first frames passing the thresholds) or "top_k"
+            (highest weighted feature scores over the whole video)
+        feature_weights: Feature name -> weight for top_k ranking
+        blur_ratio: Replace or drop candidates less sharp than this fraction
+            of the sharpness typical of recent samples (0 disables)
+        api_image_size: Longest side in pixels of the copy uploaded to vision
+            APIs (FrameBundle.api_jpeg); 0 uploads full frames
+        api_image_quality: JPEG quality of the upload copy
+        keep_full_frames: Keep full-resolution JPEGs next to the upload copies
         
     Returns:
         Tuple containing:
-        - List of extracted frame paths
-        - List of scene change frame paths
-        - List of tuples containing (frame path, motion score)
+        - List of extracted frames (in-memory FrameBundle objects)
+        - List of scene change frames
+        - List of tuples containing (frame, motion score)
         - Video duration in seconds
-        - Video metadata dictionary
+        - Video metadata dictionary, with the saved frames' perceptual hashes
+          under "frame_hashes" (frame name -> 16 hex digits), the probe
+          under "video_probe" and FrameExtractor.get_memory_usage() under
+          "frame_memory" (absent when served from cache)
     """
     logger.debug("Step 2: Extracting frames...")
+    metadata = _load_metadata(output_dir)
+    probe = probe or probe_video(video_file)
+    metadata["video_probe"] = probe.to_dict()
     
-    # Load video metadata
-    metadata = {}
-    metadata_file = output_dir / "video_metadata.json"
-    if metadata_file.exists():
-        try:
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                import json
-                metadata = json.load(f)
-            logger.debug("Loaded video metadata")
-        except Exception as e:
-            logger.warning(f"Error loading metadata: {str(e)}")
+    cache = get_frame_cache() if use_cache else None
+    if cache:
+        # Keyframe decoding changes which frames are seen and ffmpeg decoding how they
+        # are scaled; seek and linear agree
+        cache_key = cache.make_key(video_file, dict(
+            min_scene_change=min_scene_change,
+            min_motion_threshold=min_motion_threshold,
+            max_frames=max_frames,
+            analysis_size=analysis_size,
+            keyframes=decode_mode == "keyframes",
+            ffmpeg=decode_mode == "ffmpeg",
+            parallel=workers > 1 and selection == "greedy",
+            scorer=scorer,
+            min_hash_distance=min_hash_distance,
+            adaptive=adaptive and workers <= 1 and selection == "greedy" and decode_mode not in FrameExtractor.PIPE_DECODE_MODES,
+            selection=selection,
+            feature_weights=feature_weights if selection == "top_k" else None,
+            blur_ratio=blur_ratio,
+            api_image=(api_image_size, api_image_quality, keep_full_frames) if api_image_size else None
+        ))
+        cached = cache.get(cache_key)
+        if cached:
+            key_frames, duration = cached
+            scene_changes, motion_scores, metadata["frame_hashes"] = _restore_cached_frames(
+                key_frames, output_dir, save_frames
+            )
+            logger.debug(f"Served {len(key_frames)} key frames from cache ({cache.stats()})")
+            return key_frames, scene_changes, motion_scores, duration, metadata
     
-    # Get video duration
-    cap = cv2.VideoCapture(str(video_file))
-    if not cap.isOpened():
-        raise ValueError(f"Could not open video: {video_file}")
-    
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    duration = frame_count / fps if fps > 0 else 0
-    cap.release()
-    
-    frame_extractor = FrameExtractor(video_file, output_dir)
+    duration = probe.duration
+    frame_extractor = FrameExtractor(video_file, output_dir, analysis_size=analysis_size, scorer=scorer,
+                                     save_frames=save_frames, probe=probe, feature_weights=feature_weights,
+                                     api_image_size=api_image_size, api_image_quality=api_image_quality,
+                                     keep_full_frames=keep_full_frames, blur_ratio=blur_ratio)
     key_frames = frame_extractor.extract_frames(
         min_scene_change=min_scene_change,
         min_motion_threshold=min_motion_threshold,
         max_frames=max_frames,
-        frame_interval=5  # Sample every 5 frames instead of every frame
+        frame_interval=5,  # Sample every 5 frames instead of every frame
+        decode_mode=decode_mode,
+        workers=workers,
+        min_hash_distance=min_hash_distance,
+        adaptive=adaptive,
+        selection=selection
     )
     
     scene_changes = frame_extractor.get_scene_changes()
     motion_scores = frame_extractor.get_motion_scores()
+    metadata["frame_hashes"] = dict(frame_extractor.get_frame_hashes())
+    metadata["frame_memory"] = frame_extractor.get_memory_usage()
+    if cache:
+        cache.put(cache_key, key_frames, duration)
     
     logger.debug(f"Extracted {len(key_frames)} key frames")
     logger.debug(f"Detected {len(scene_changes)} scene changes")
+    logger.debug(f"Feature timings: {frame_extractor.get_feature_timings()}")
     logger.debug(f"Final video duration: {duration:.2f} seconds")
     
-    return key_frames, scene_changes, motion_scores, duration, metadata 
\ No newline at end of file
+    return key_frames, scene_changes, motion_scores, duration, metadata 
+
+async def _cache_stream(frames: AsyncIterator[FrameBundle], cache: FrameCache, video_file: Path, params: dict,
+                        duration: float, output_dir: Path, save_frames: bool,
+                        frame_hashes: Dict[str, str]) -> AsyncIterator[FrameBundle]:
+    """
+    Serve a frame stream from the cache, or pass it through and store it
+    once it completes. The key hashes the whole video file, so it and the
+    other cache I/O run in worker threads, off the event loop; frames is
+    not iterated on a hit, so nothing is decoded.
+    """
+    try:
+        cache_key = await asyncio.to_thread(cache.make_key, video_file, params)
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached:
+            key_frames, _ = cached
+            _, _, hashes = await asyncio.to_thread(_restore_cached_frames, key_frames, output_dir, save_frames)
+            frame_hashes.update(hashes)
+            logger.debug(f"Serving {len(key_frames)} key frames from cache ({cache.stats()})")
+            for frame in key_frames:
+                yield frame
+            return
+        
+        selected = []
+        async for frame in frames:
+            selected.append(frame)
+            yield frame
+        await asyncio.to_thread(cache.put, cache_key, selected, duration)
+    finally:
+        await frames.aclose()
+
+def execute_step_streaming(
+    video_file: Path,
+    output_dir: Path,
+    min_scene_change: float = 30.0,
+    min_motion_threshold: float = 2.0,
+    max_frames: int = 4,
+    decode_mode: str = "auto",
+    analysis_size: int = FrameExtractor.DEFAULT_ANALYSIS_SIZE,
+    scorer: str = "flow",
+    min_hash_distance: int = FrameExtractor.DEFAULT_HASH_DISTANCE,
+    save_frames: bool = False,
+    adaptive: bool = True,
+    use_cache: bool = True,
+    probe: Optional[VideoProbe] = None,
+    blur_ratio: float = FrameExtractor.DEFAULT_BLUR_RATIO,
+    api_image_size: int = FrameExtractor.DEFAULT_API_IMAGE_SIZE,
+    api_image_quality: int = FrameExtractor.DEFAULT_API_IMAGE_QUALITY,
+    keep_full_frames: bool = True
+) -> Tuple[AsyncIterator[FrameBundle], float, dict]:
+    """
+    Start frame extraction and return the frames as an async stream.
+    
+    Takes the same arguments as execute_step (parallel workers excepted,
+    since they only produce frames at the end). Nothing is read, hashed
+    or decoded until the stream is iterated, e.g. by Step 3's
+    execute_stream_step.
+    
+    Returns:
+        Tuple containing:
+        - Async iterator of FrameBundle objects, in selection order
+        - Video duration in seconds
+        - Video metadata dictionary with "video_probe"; "frame_hashes" is filled
+          in as frames are selected
+    """
+    logger.debug("Step 2: Streaming frames...")
+    metadata = _load_metadata(output_dir)
+    probe = probe or probe_video(video_file)
+    metadata["video_probe"] = probe.to_dict()
+    
+    duration = probe.duration
+    frame_extractor = FrameExtractor(video_file, output_dir, analysis_size=analysis_size, scorer=scorer,
+                                     save_frames=save_frames, probe=probe, api_image_size=api_image_size,
+                                     api_image_quality=api_image_quality, keep_full_frames=keep_full_frames,
+                                     blur_ratio=blur_ratio)
+    metadata["frame_hashes"] = frame_extractor.get_frame_hashes()
+    frames = frame_extractor.aiter_frames(
+        min_scene_change=min_scene_change,
+        min_motion_threshold=min_motion_threshold,
+        max_frames=max_frames,
+        frame_interval=5,  # Sample every 5 frames instead of every frame
+        decode_mode=decode_mode,
+        min_hash_distance=min_hash_distance,
+        adaptive=adaptive
+    )
+    if use_cache:
+        cache_params = dict(
+            min_scene_change=min_scene_change,
+            min_motion_threshold=min_motion_threshold,
+            max_frames=max_frames,
+            analysis_size=analysis_size,
+            keyframes=decode_mode == "keyframes",
+            ffmpeg=decode_mode == "ffmpeg",
+            parallel=False,
+            scorer=scorer,
+            min_hash_distance=min_hash_distance,
+            adaptive=adaptive and decode_mode not in FrameExtractor.PIPE_DECODE_MODES,
+            selection="greedy",
+            feature_weights=None,
+            blur_ratio=blur_ratio,
+            api_image=(api_image_size, api_image_quality, keep_full_frames) if api_image_size else None
+        )
+        frames = _cache_stream(frames, get_frame_cache(), video_file, cache_params, duration, output_dir,
+                               save_frames, metadata["frame_hashes"])
+    
+    logger.debug(f"Video duration: {duration:.2f} seconds")
+    return frames, duration, metadata
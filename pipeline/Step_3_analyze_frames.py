@@ -3,18 +3,42 @@ Step 3: Frame analysis module
 Analyzes extracted frames using Google Vision and OpenAI Vision APIs
 """
 
+import asyncio
 import base64
+import hashlib
 import json
 import logging
 import os
+import sqlite3
+import threading
+import time
+import weakref
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
+import cv2
+import numpy as np
 from google.cloud import vision
-from openai import OpenAI
+from openai import AsyncOpenAI
+
+from .Step_2_extract_frames import FrameBundle
 
 logger = logging.getLogger(__name__)
 
+# One semaphore per event loop, shared by every job running on it
+_api_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def get_api_semaphore() -> asyncio.Semaphore:
+    """
+    Semaphore bounding the vision API requests in flight across all jobs on
+    the running event loop, configured from the environment:
+    VISION_MAX_CONCURRENCY (default 8).
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _api_semaphores:
+        _api_semaphores[loop] = asyncio.Semaphore(int(os.getenv("VISION_MAX_CONCURRENCY", "8")))
+    return _api_semaphores[loop]
+
 def convert_numpy_floats(obj):
     """Convert any numpy float types to Python floats for JSON serialization."""
     if isinstance(obj, dict):
@@ -25,42 +49,245 @@ def convert_numpy_floats(obj):
         return float(obj)
     return obj
 
+class VisionCache:
+    """
+    Persistent cache of vision API results in SQLite.
+    Entries are keyed by a frame's perceptual hash and coarse colour layout
+    (see frame_key) plus what produced the result (API, feature set, model,
+    prompt), so reposted clips and near-identical frames skip paid API calls. Entries expire after a TTL
+    and the least recently used are evicted once the stored results exceed
+    max_bytes. Reads and writes run in worker threads so SQLite I/O does
+    not block the event loop.
+    """
+    
+    VERSION = 2  # Bump when stored results change shape so old entries stop matching
+    COLOUR_LAYOUT_SIZE = 4  # Side of the thumbnail whose colours join the perceptual hash in keys
+    COLOUR_LAYOUT_SHIFT = 5  # Bits dropped per channel, so re-encoding noise keeps the same layout
+    
+    def __init__(self, db_path: Path, max_bytes: int, ttl: float):
+        """
+        Initialize vision cache.
+        
+        Args:
+            db_path: SQLite database file
+            max_bytes: Total size of stored results above which least recently used ones are evicted
+            ttl: Seconds after which a stored result is no longer served
+        """
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by the worker threads, one statement at a time
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.db_path), timeout=10, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._db.commit()
+    
+    def frame_key(self, frame: FrameBundle) -> str:
+        """
+        Identity of a frame in cache keys: its perceptual hash plus a coarse
+        colour layout. The hash only sees gradients, so flat frames of any
+        colour (all dHash 0) and frames with the same structure in different
+        colours would otherwise share results across unrelated videos.
+        Frames that do not decode are keyed by their exact bytes.
+        """
+        image = cv2.imdecode(np.frombuffer(frame.api_jpeg, dtype=np.uint8), cv2.IMREAD_REDUCED_COLOR_8)
+        if image is None:
+            return hashlib.blake2b(frame.api_jpeg, digest_size=20).hexdigest()
+        size = (self.COLOUR_LAYOUT_SIZE, self.COLOUR_LAYOUT_SIZE)
+        layout = cv2.resize(image, size, interpolation=cv2.INTER_AREA) >> self.COLOUR_LAYOUT_SHIFT
+        return f"{frame.frame_hash}:{layout.tobytes().hex()}"
+    
+    def make_key(self, api: str, frame_key: str, params: dict) -> str:
+        """Cache key for one API's result on a frame (see frame_key), given what the result depends on."""
+        encoded_params = json.dumps({"version": self.VERSION, "api": api, **params}, sort_keys=True)
+        return hashlib.blake2b(f"{frame_key}:{encoded_params}".encode(), digest_size=20).hexdigest()
+    
+    async def get(self, api: str, key: str) -> Optional[dict]:
+        """Return a stored result, or None on a miss or when it has expired."""
+        return await asyncio.to_thread(self._get, api, key)
+    
+    async def put(self, key: str, result: dict):
+        """Store a result and evict expired and least recently used entries over the size limit."""
+        await asyncio.to_thread(self._put, key, result)
+    
+    def _get(self, api: str, key: str) -> Optional[dict]:
+        """Blocking form of get."""
+        now = time.time()
+        with self._lock:
+            result = self._read_entry(key, now)
+            counters = self.misses if result is None else self.hits
+            counters[api] = counters.get(api, 0) + 1
+        return result
+    
+    def _read_entry(self, key: str, now: float) -> Optional[dict]:
+        """Read one entry, deleting it if expired and marking it used otherwise."""
+        try:
+            row = self._db.execute("SELECT result, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                row = None
+            else:
+                self._db.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return json.loads(row[0]) if row is not None else None
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Could not read vision cache: {str(e)}")
+            return None
+    
+    def _put(self, key: str, result: dict):
+        """Blocking form of put."""
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, result, created, last_used) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(result), now, now)
+                )
+                self._db.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,))
+                # Keep the most recently used results whose running size fits in max_bytes
+                self._db.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM ("
+                    "SELECT key, SUM(LENGTH(result)) OVER (ORDER BY last_used DESC, key) AS total FROM results"
+                    ") WHERE total > ?)",
+                    (self.max_bytes,)
+                )
+                self._db.commit()
+            except (sqlite3.Error, TypeError) as e:
+                logger.warning(f"Could not write vision cache entry: {str(e)}")
+    
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Hit/miss counters per API since this cache object was created; each hit is an API call saved."""
+        stats = {}
+        for api in sorted(set(self.hits) | set(self.misses)):
+            hits, misses = self.hits.get(api, 0), self.misses.get(api, 0)
+            stats[api] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+        return stats
+
+_vision_cache = None
+
+def get_vision_cache() -> VisionCache:
+    """
+    Shared vision result cache for the process, configured from the
+    environment: VISION_CACHE_PATH (default cache/vision.sqlite3),
+    VISION_CACHE_MAX_MB (default 100) and VISION_CACHE_TTL_HOURS
+    (default 168).
+    """
+    global _vision_cache
+    if _vision_cache is None:
+        _vision_cache = VisionCache(
+            Path(os.getenv("VISION_CACHE_PATH", "cache/vision.sqlite3")),
+            int(os.getenv("VISION_CACHE_MAX_MB", "100")) * 1024 * 1024,
+            float(os.getenv("VISION_CACHE_TTL_HOURS", "168")) * 3600
+        )
+    return _vision_cache
+
 class VisionAnalyzer:
     """Handles image analysis using multiple vision APIs with optimized usage."""
     
-    def __init__(self, frames_dir: Path, output_dir: Path, metadata: Optional[dict] = None):
+    VISION_BATCH_SIZE = 16  # Images per batch_annotate_images request (the API's limit)
+    VISION_FEATURES = (vision.Feature.Type.LABEL_DETECTION, vision.Feature.Type.OBJECT_LOCALIZATION)
+    OPENAI_MODEL = "gpt-4o"
+    SPECULATIVE_CONFIDENCE = 0.9  # Label confidence at which a frame's OpenAI request starts early
+    SPECULATIVE_MARGIN = 0.05  # Confidence by which a later frame must beat the speculative one to replace it
+    OPENAI_MODES = ("single", "multi")
+    MULTI_IMAGE_MAX_FRAMES = 8  # Frames sent in one multi-image request
+    MULTI_IMAGE_DETAIL = "low"  # Fixed low-resolution image tokens per frame
+    MULTI_IMAGE_TOKENS_PER_FRAME = 150  # Completion budget per frame description
+    
+    def __init__(self, output_dir: Path, metadata: Optional[dict] = None,
+                 api_semaphore: Optional[asyncio.Semaphore] = None, use_cache: bool = True,
+                 speculative_openai: bool = False, openai_mode: str = "single"):
         """
-        Initialize vision analyzer.
+        Initialize vision analyzer. Must be created on the event loop that
+        runs the analysis, since the API clients are bound to it.
         
         Args:
-            frames_dir: Directory containing frames to analyze
             output_dir: Directory to save analysis results
             metadata: Video metadata dictionary
+            api_semaphore: Bounds concurrent API requests (defaults to get_api_semaphore())
+            use_cache: Reuse results for frames with the same perceptual hash and colour layout (see get_vision_cache)
+            speculative_openai: Start the OpenAI request while Google Vision
+                results are still arriving (see _speculate); single mode only
+            openai_mode: "single" (detailed analysis of the most confident frame)
+                or "multi" (every analyzed frame, with timestamps, described in
+                one request; see analyze_frames_openai)
         """
-        self.frames_dir = frames_dir
+        if openai_mode not in self.OPENAI_MODES:
+            raise ValueError(f"Unknown OpenAI mode: {openai_mode}")
+        if speculative_openai and openai_mode == "multi":
+            logger.warning("Speculative OpenAI analysis needs the single mode, disabling it")
+            speculative_openai = False
         self.output_dir = output_dir
         self.metadata = metadata or {}
         
-        # Initialize API clients
-        self.vision_client = vision.ImageAnnotatorClient()
-        self.openai_client = OpenAI()  # Initialize without explicit API key
+        # Initialize API clients; both are non-blocking so a job in analysis
+        # does not hold up the event loop other users' updates run on
+        self.vision_client = vision.ImageAnnotatorAsyncClient()
+        self.openai_client = AsyncOpenAI()  # Initialize without explicit API key
+        self.api_semaphore = api_semaphore or get_api_semaphore()
+        self.cache = get_vision_cache() if use_cache else None
+        self.speculative_openai = speculative_openai
+        self.openai_mode = openai_mode
+        
+        # Speculative OpenAI request: (frame, its confidence, task), with the
+        # labels and objects seen so far as its prompt context
+        self._speculation: Optional[Tuple[FrameBundle, float, asyncio.Task]] = None
+        self._speculation_cancelled = False
+        self._seen_labels: Dict[str, None] = {}
+        self._seen_objects: Dict[str, None] = {}
         
         # Analysis storage
         self.google_vision_results = {}
         self.openai_results = {}
+        
+        # Image bytes sent per API, next to what full-resolution frames would have cost
+        self.upload_bytes = {
+            api: {"requests": 0, "bytes": 0, "full_frame_bytes": 0}
+            for api in ("google_vision", "openai")
+        }
+        
+        # Tokens billed for OpenAI requests (cached results cost none)
+        self.openai_usage = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    
+    def _count_upload(self, api: str, uploaded: int, full_frame: int):
+        """Add one request's image payload to the upload report."""
+        stats = self.upload_bytes[api]
+        stats["requests"] += 1
+        stats["bytes"] += uploaded
+        stats["full_frame_bytes"] += full_frame
     
-    def select_key_frames(self, scene_changes: List[Path], motion_scores: List[Tuple[Path, float]], max_frames: int = 8) -> List[Path]:
+    def _count_tokens(self, usage):
+        """Add one OpenAI response's token usage to the usage report."""
+        self.openai_usage["requests"] += 1
+        if usage is not None:
+            self.openai_usage["prompt_tokens"] += usage.prompt_tokens
+            self.openai_usage["completion_tokens"] += usage.completion_tokens
+            self.openai_usage["total_tokens"] += usage.total_tokens
+    
+    async def close(self):
+        """Close the API clients' connections."""
+        await self.openai_client.close()
+        await self.vision_client.transport.close()
+    
+    def select_key_frames(self, scene_changes: List[FrameBundle], motion_scores: List[Tuple[FrameBundle, float]], max_frames: int = 8) -> List[FrameBundle]:
         """
         Select key frames for detailed analysis.
         Prioritizes scene changes and high motion frames.
         
         Args:
             scene_changes: List of frames where scene changes were detected
-            motion_scores: List of tuples containing (frame_path, motion_score)
+            motion_scores: List of tuples containing (frame, motion_score)
             max_frames: Maximum number of frames to select (default: 8)
             
         Returns:
-            List of selected frame paths
+            List of selected frames
         """
         selected_frames = []
         
@@ -73,80 +300,266 @@ class VisionAnalyzer:
         sorted_motion = sorted(motion_scores, key=lambda x: x[1], reverse=True)
         
         # Add highest motion frames that aren't too close to already selected frames
-        for frame_path, _ in sorted_motion:
+        for frame, _ in sorted_motion:
             if len(selected_frames) >= max_frames:
                 break
                 
             # Check if frame is sufficiently different in time from selected frames
-            frame_time = float(frame_path.name.split('_')[1].replace('s.jpg', ''))
             is_unique = all(
-                abs(float(f.name.split('_')[1].replace('s.jpg', '')) - frame_time) > 2.0  # Reduced time difference threshold
+                abs(f.timestamp - frame.timestamp) > 2.0  # Reduced time difference threshold
                 for f in selected_frames
             )
             
-            if is_unique and frame_path not in selected_frames:
-                selected_frames.append(frame_path)
+            if is_unique and frame not in selected_frames:
+                selected_frames.append(frame)
         
         return selected_frames
     
-    async def analyze_frame_google_vision(self, frame_path: Path) -> Tuple[Optional[dict], bool]:
+    async def analyze_frame_google_vision(self, frame: FrameBundle) -> Tuple[Optional[dict], bool]:
         """
         Analyze a frame using Google Vision API.
         Optimized to use only essential features.
         """
-        try:
-            with open(frame_path, "rb") as image_file:
-                content = image_file.read()
-            
-            image = vision.Image(content=content)
-            features = [
-                vision.Feature(type_=vision.Feature.Type.LABEL_DETECTION),
-                vision.Feature(type_=vision.Feature.Type.OBJECT_LOCALIZATION)
-            ]
-            request = vision.AnnotateImageRequest(image=image, features=features)
-            response = self.vision_client.annotate_image(request)
+        return (await self.analyze_frames_google_vision([frame]))[0]
+    
+    async def analyze_frames_google_vision(self, frames: List[FrameBundle]) -> List[Tuple[Optional[dict], bool]]:
+        """
+        Analyze frames using Google Vision API, VISION_BATCH_SIZE images per
+        batch_annotate_images request, so a job costs one round trip instead
+        of one per frame. Requests for several batches run concurrently.
+        
+        Args:
+            frames: Frames to analyze
             
-            return {
-                "labels": [label.description for label in response.label_annotations],
-                "objects": [obj.name for obj in response.localized_object_annotations],
-                "confidence": float(response.label_annotations[0].score) if response.label_annotations else 0.0
-            }, True
+        Returns:
+            (analysis, success) per frame, in the order of frames. A frame the
+            API reports an error for fails on its own; a failed request fails
+            every frame in it. Cached frames are not sent.
+        """
+        results: List[Optional[Tuple[Optional[dict], bool]]] = [None] * len(frames)
+        keys = [None] * len(frames)
+        if self.cache:
+            features = [vision.Feature.Type(feature).name for feature in self.VISION_FEATURES]
+            for index, frame in enumerate(frames):
+                keys[index] = self.cache.make_key("google_vision", self.cache.frame_key(frame), {"features": features})
+                cached = await self.cache.get("google_vision", keys[index])
+                if cached is not None:
+                    results[index] = (cached, True)
+        
+        misses = [index for index, result in enumerate(results) if result is None]
+        chunks = [misses[start:start + self.VISION_BATCH_SIZE] for start in range(0, len(misses), self.VISION_BATCH_SIZE)]
+        chunk_results = await asyncio.gather(*(
+            self._annotate_batch([frames[index] for index in chunk]) for chunk in chunks
+        ))
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            for index, (analysis, success) in zip(chunk, chunk_result):
+                results[index] = (analysis, success)
+                if success and self.cache:
+                    await self.cache.put(keys[index], analysis)
+        return results
+    
+    async def _annotate_batch(self, frames: List[FrameBundle]) -> List[Tuple[Optional[dict], bool]]:
+        """Send one batch_annotate_images request and map its responses back to frames."""
+        try:
+            self._count_upload("google_vision", sum(len(frame.api_jpeg) for frame in frames),
+                               sum(len(frame.jpeg) for frame in frames))
+            async with self.api_semaphore:
+                response = await self.vision_client.batch_annotate_images(
+                    requests=[self._build_vision_request(frame) for frame in frames]
+                )
         except Exception as e:
             logger.error(f"Google Vision API error: {str(e)}")
-            return None, False
+            return [(None, False) for _ in frames]
+        
+        results = []
+        for frame, frame_response in zip(frames, response.responses):
+            if frame_response.error.code:
+                logger.error(f"Google Vision API error for {frame.name}: {frame_response.error.message}")
+                results.append((None, False))
+            else:
+                results.append((self._parse_vision_response(frame_response), True))
+        # A short reply leaves the remaining frames without results
+        for frame in frames[len(response.responses):]:
+            logger.error(f"Google Vision API returned no result for {frame.name}")
+            results.append((None, False))
+        return results
+    
+    def _build_vision_request(self, frame: FrameBundle) -> vision.AnnotateImageRequest:
+        """Google Vision request for one frame's upload copy, with only the essential features."""
+        features = [vision.Feature(type_=feature) for feature in self.VISION_FEATURES]
+        return vision.AnnotateImageRequest(image=vision.Image(content=frame.api_jpeg), features=features)
     
-    async def analyze_frame_openai(self, frame_path: Path, google_analysis: Optional[dict] = None) -> Tuple[Optional[dict], bool]:
+    @staticmethod
+    def _parse_vision_response(response: vision.AnnotateImageResponse) -> dict:
+        """Labels, objects and top label confidence from one image's response."""
+        return {
+            "labels": [label.description for label in response.label_annotations],
+            "objects": [obj.name for obj in response.localized_object_annotations],
+            "confidence": float(response.label_annotations[0].score) if response.label_annotations else 0.0
+        }
+    
+    async def analyze_frame_openai(self, frame: FrameBundle, google_analysis: Optional[dict] = None) -> Tuple[Optional[dict], bool]:
         """
         Analyze a frame using OpenAI Vision API.
         Provides detailed scene understanding.
         """
+        prompt = self._build_openai_prompt(google_analysis)
+        cache_key = None
+        if self.cache:
+            # The prompt carries the video's title and description and the detected labels
+            cache_key = self.cache.make_key("openai", self.cache.frame_key(frame), {
+                "model": self.OPENAI_MODEL,
+                "prompt": hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+            })
+            cached = await self.cache.get("openai", cache_key)
+            if cached is not None:
+                return cached, True
+        
         try:
-            with open(frame_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+            base64_image = base64.b64encode(frame.api_jpeg).decode('utf-8')
+            self._count_upload("openai", len(base64_image), 4 * ((len(frame.jpeg) + 2) // 3))
             
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": self._build_openai_prompt(google_analysis)},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}",
+            async with self.api_semaphore:
+                response = await self.openai_client.chat.completions.create(
+                    model=self.OPENAI_MODEL,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {"type": "text", "text": prompt},
+                                {
+                                    "type": "image_url",
+                                    "image_url": {
+                                        "url": f"data:image/jpeg;base64,{base64_image}",
+                                    },
                                 },
-                            },
-                        ],
-                    }
-                ],
-                max_tokens=300,
-            )
+                            ],
+                        }
+                    ],
+                    max_tokens=300,
+                )
+            
+            self._count_tokens(response.usage)
+            openai_analysis = {"detailed_description": response.choices[0].message.content}
+        except Exception as e:
+            logger.error(f"OpenAI Vision API error: {str(e)}")
+            return None, False
+        
+        if self.cache:
+            await self.cache.put(cache_key, openai_analysis)
+        return openai_analysis, True
+    
+    async def analyze_frames_openai(self, frames: List[FrameBundle],
+                                    google_analyses: List[dict]) -> Tuple[Optional[List[dict]], bool]:
+        """
+        Describe several frames with OpenAI Vision API in one request.
+        Each frame's upload copy goes in at MULTI_IMAGE_DETAIL with its
+        timestamp and detected labels, and the model answers with one JSON
+        description per frame, so the commentary gets context for every
+        frame at the cost of a single round trip.
+        
+        Args:
+            frames: Frames to describe, in time order
+            google_analyses: Google Vision analysis of each frame
             
-            return {"detailed_description": response.choices[0].message.content}, True
+        Returns:
+            (one openai_vision entry per frame, or None where the model
+            skipped the frame; success)
+        """
+        prompt = self._build_openai_multi_prompt(len(frames))
+        content = [{"type": "text", "text": prompt}]
+        for index, (frame, google_analysis) in enumerate(zip(frames, google_analyses), 1):
+            content.append({"type": "text", "text": self._describe_frame_context(index, frame, google_analysis)})
+            content.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:image/jpeg;base64,{base64.b64encode(frame.api_jpeg).decode('utf-8')}",
+                    "detail": self.MULTI_IMAGE_DETAIL,
+                },
+            })
+        
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key("openai_multi", ",".join(self.cache.frame_key(frame) for frame in frames), {
+                "model": self.OPENAI_MODEL,
+                "detail": self.MULTI_IMAGE_DETAIL,
+                "prompt": hashlib.blake2b(json.dumps(
+                    [part["text"] for part in content if part["type"] == "text"]
+                ).encode(), digest_size=16).hexdigest()
+            })
+            cached = await self.cache.get("openai_multi", cache_key)
+            if cached is not None:
+                return cached["frames"], True
+        
+        try:
+            self._count_upload(
+                "openai",
+                sum(4 * ((len(frame.api_jpeg) + 2) // 3) for frame in frames),
+                sum(4 * ((len(frame.jpeg) + 2) // 3) for frame in frames)
+            )
+            async with self.api_semaphore:
+                response = await self.openai_client.chat.completions.create(
+                    model=self.OPENAI_MODEL,
+                    messages=[{"role": "user", "content": content}],
+                    response_format={"type": "json_object"},
+                    max_tokens=self.MULTI_IMAGE_TOKENS_PER_FRAME * len(frames),
+                )
+            self._count_tokens(response.usage)
+            descriptions = json.loads(response.choices[0].message.content)["frames"]
         except Exception as e:
             logger.error(f"OpenAI Vision API error: {str(e)}")
             return None, False
+        
+        # Map descriptions back by frame number
+        by_number = {}
+        for description in descriptions:
+            try:
+                by_number[int(description["frame"])] = description
+            except (KeyError, TypeError, ValueError):
+                continue
+        openai_analyses = []
+        for index in range(1, len(frames) + 1):
+            description = by_number.get(index)
+            openai_analyses.append(None if description is None else {
+                "detailed_description": str(description.get("description", "")),
+                "subjects": self._parse_subjects(description.get("subjects")),
+                "action": str(description.get("action", ""))
+            })
+        
+        if self.cache:
+            await self.cache.put(cache_key, {"frames": openai_analyses})
+        return openai_analyses, True
+    
+    @staticmethod
+    def _parse_subjects(subjects) -> List[str]:
+        """Subjects from a model answer as a list of strings; a bare string is one subject, anything else is dropped."""
+        if isinstance(subjects, str):
+            subjects = [subjects]
+        if not isinstance(subjects, list):
+            return []
+        return [subject.strip() for subject in subjects if isinstance(subject, str) and subject.strip()]
+    
+    @staticmethod
+    def _describe_frame_context(index: int, frame: FrameBundle, google_analysis: dict) -> str:
+        """Caption placed before a frame's image in a multi-image request."""
+        caption = f"Frame {index} at {frame.timestamp:.2f}s"
+        if frame.is_scene_change:
+            caption += " (scene change)"
+        labels = google_analysis.get("labels", [])[:5] + google_analysis.get("objects", [])[:5]
+        if labels:
+            caption += f", detected: {', '.join(dict.fromkeys(labels))}"
+        return caption
+    
+    def _build_openai_multi_prompt(self, frame_count: int) -> str:
+        """Build prompt for a multi-image OpenAI Vision API request."""
+        return f"""These are {frame_count} frames from one video, in time order. Each image follows a caption with its frame number, timestamp and the elements computer vision detected in it.
+
+Video Title: {self.metadata.get('title', 'Unknown')}
+Description: {self.metadata.get('description', 'No description available')}
+
+Describe each frame in relation to the video's context and to the frames around it. Answer with a JSON object of the form:
+{{"frames": [{{"frame": <frame number>, "description": "<two or three sentences on the main subject and what is happening>", "subjects": ["<main subjects>"], "action": "<the action or movement, or an empty string>"}}]}}
+with one entry for every frame."""
     
     def _build_openai_prompt(self, google_analysis: Optional[dict] = None) -> str:
         """Build prompt for OpenAI Vision API analysis."""
@@ -180,15 +593,72 @@ Keep the analysis natural and focused on how this frame relates to the video's c
         
         return prompt
     
-    async def analyze_video(self, scene_changes: List[Path], motion_scores: List[Tuple[Path, float]], video_duration: float) -> dict:
+    async def _annotate_frame(self, frame: FrameBundle) -> Tuple[dict, bool]:
+        """Build the result entry for a frame and run Google Vision on it."""
+        google_analysis, success = await self.analyze_frame_google_vision(frame)
+        if success and self.speculative_openai:
+            self._speculate(frame, google_analysis)
+        return self._frame_result(frame, google_analysis if success else None), success
+    
+    def _speculate(self, frame: FrameBundle, google_analysis: dict):
         """
-        Main analysis workflow with optimized API usage.
-        Analyzes more frames with Google Vision and uses OpenAI for final confirmation.
+        Start the OpenAI request for the first frame that is confident
+        enough (SPECULATIVE_CONFIDENCE) or is a scene change, as soon as its
+        Google Vision result arrives, so the request overlaps the remaining
+        annotations. Its prompt lists the labels and objects seen so far.
+        The request is cancelled once a frame more than SPECULATIVE_MARGIN
+        more confident arrives, and _finish_analysis then runs OpenAI on
+        the best frame as usual.
+        """
+        self._seen_labels.update(dict.fromkeys(google_analysis.get("labels", [])))
+        self._seen_objects.update(dict.fromkeys(google_analysis.get("objects", [])))
+        confidence = google_analysis.get("confidence", 0)
+        if self._speculation is not None:
+            # A clearly better frame means the speculative result will be discarded
+            speculative_frame, speculative_confidence, task = self._speculation
+            if confidence - speculative_confidence > self.SPECULATIVE_MARGIN and not self._speculation_cancelled:
+                logger.debug(f"Cancelling speculative OpenAI analysis of {speculative_frame.name}, "
+                             f"{frame.name} is more confident")
+                task.cancel()
+                self._speculation_cancelled = True
+            return
+        
+        if confidence >= self.SPECULATIVE_CONFIDENCE or frame.is_scene_change:
+            logger.debug(f"Starting speculative OpenAI analysis on {frame.name} (confidence {confidence:.2f})")
+            task = asyncio.create_task(self.analyze_frame_openai(frame, {
+                "labels": list(self._seen_labels),
+                "objects": list(self._seen_objects)
+            }))
+            self._speculation = (frame, confidence, task)
+    
+    async def _annotate_frames(self, frames: List[FrameBundle]) -> List[Tuple[FrameBundle, dict, bool]]:
+        """Build the result entries for frames and run Google Vision on them in batches."""
+        analyses = await self.analyze_frames_google_vision(frames)
+        return [
+            (frame, self._frame_result(frame, google_analysis if success else None), success)
+            for frame, (google_analysis, success) in zip(frames, analyses)
+        ]
+    
+    @staticmethod
+    def _frame_result(frame: FrameBundle, google_analysis: Optional[dict]) -> dict:
+        """Result entry for a frame, with its Google Vision analysis when there is one."""
+        frame_result = {
+            "frame": frame.name,
+            "timestamp": round(float(frame.timestamp), 2),
+            "scene_change": bool(frame.is_scene_change),
+            "motion_score": float(frame.motion_score)
+        }
+        if google_analysis is not None:
+            # Convert any numpy floats to Python floats
+            frame_result["google_vision"] = convert_numpy_floats(google_analysis)
+        return frame_result
+    
+    async def _finish_analysis(self, annotated: List[Tuple[FrameBundle, dict, bool]]) -> dict:
+        """
+        Run OpenAI on the most confident annotated frame and save the results.
         
         Args:
-            scene_changes: List of frames where scene changes were detected
-            motion_scores: List of tuples containing (frame_path, motion_score)
-            video_duration: Duration of the video in seconds
+            annotated: (frame, frame result, Google Vision success) in frame order
             
         Returns:
             Dictionary containing analysis results
@@ -196,58 +666,73 @@ Keep the analysis natural and focused on how this frame relates to the video's c
         # Convert any numpy floats in metadata to Python floats
         metadata = convert_numpy_floats(self.metadata)
         
-        # Convert motion scores to Python floats
-        motion_scores = [(path, float(score)) for path, score in motion_scores]
-        
         final_results = {
             "metadata": metadata,
             "frames": []
         }
         
-        # Select key frames for analysis
-        key_frames = self.select_key_frames(scene_changes, motion_scores)
-        logger.info(f"Selected {len(key_frames)} key frames for analysis")
-        
-        # Analyze all selected frames with Google Vision
         google_vision_results = []
-        for frame_path in key_frames:
-            frame_result = {
-                "frame": frame_path.name,
-                "timestamp": float(frame_path.name.split('_')[1].replace('s.jpg', ''))  # Convert to float
-            }
-            
-            # Google Vision Analysis for all frames
-            google_analysis, success = await self.analyze_frame_google_vision(frame_path)
+        frames_by_name = {}
+        for frame, frame_result, success in annotated:
             if success:
-                # Convert any numpy floats to Python floats
-                google_analysis = convert_numpy_floats(google_analysis)
-                frame_result["google_vision"] = google_analysis
                 google_vision_results.append(frame_result)
                 final_results["frames"].append(frame_result)
+                frames_by_name[frame.name] = frame
         
         # Select one representative frame for OpenAI analysis
-        if google_vision_results:
+        speculation, self._speculation = self._speculation, None
+        self._speculation_cancelled = False
+        if google_vision_results and self.openai_mode == "multi":
+            # Describe every analyzed frame in one request, in time order
+            described = sorted(google_vision_results, key=lambda result: result["timestamp"])
+            described = described[:self.MULTI_IMAGE_MAX_FRAMES]
+            openai_analyses, success = await self.analyze_frames_openai(
+                [frames_by_name[result["frame"]] for result in described],
+                [result["google_vision"] for result in described]
+            )
+            if success:
+                for frame_result, openai_analysis in zip(described, openai_analyses):
+                    if openai_analysis is not None:
+                        frame_result["openai_vision"] = openai_analysis
+        elif google_vision_results:
             # Choose the frame with the highest confidence score
             best_frame = max(google_vision_results, 
                            key=lambda x: x["google_vision"].get("confidence", 0))
-            frame_path = self.frames_dir / best_frame["frame"]
+            best_confidence = best_frame["google_vision"].get("confidence", 0)
             
-            # OpenAI Vision Analysis for final confirmation
-            openai_analysis, success = await self.analyze_frame_openai(
-                frame_path,
-                {
-                    "labels": list(set(
-                        label
-                        for result in google_vision_results
-                        for label in result["google_vision"].get("labels", [])
-                    )),
-                    "objects": list(set(
-                        obj
-                        for result in google_vision_results
-                        for obj in result["google_vision"].get("objects", [])
-                    ))
-                }
-            )
+            openai_analysis, success = None, False
+            if speculation is not None and best_confidence - speculation[1] <= self.SPECULATIVE_MARGIN:
+                # The speculative frame is as good as the best one; keep its request
+                speculative_frame, _, task = speculation
+                openai_analysis, success = await task
+                final_results["openai_speculation"] = {"frame": speculative_frame.name, "used": success}
+                if success:
+                    best_frame = next(result for result in google_vision_results
+                                      if result["frame"] == speculative_frame.name)
+                else:
+                    logger.warning("Speculative OpenAI request failed, retrying on the best frame")
+            elif speculation is not None:
+                speculation[2].cancel()
+                final_results["openai_speculation"] = {"frame": speculation[0].name, "used": False}
+            
+            if not success:
+                # OpenAI Vision Analysis for final confirmation
+                # (labels in frame order, so the prompt and its cache key are stable)
+                openai_analysis, success = await self.analyze_frame_openai(
+                    frames_by_name[best_frame["frame"]],
+                    {
+                        "labels": list(dict.fromkeys(
+                            label
+                            for result in google_vision_results
+                            for label in result["google_vision"].get("labels", [])
+                        )),
+                        "objects": list(dict.fromkeys(
+                            obj
+                            for result in google_vision_results
+                            for obj in result["google_vision"].get("objects", [])
+                        ))
+                    }
+                )
             
             if success:
                 # Add OpenAI analysis to the best frame
@@ -255,6 +740,19 @@ Keep the analysis natural and focused on how this frame relates to the video's c
                     if frame["frame"] == best_frame["frame"]:
                         frame["openai_vision"] = openai_analysis
                         break
+        elif speculation is not None:
+            speculation[2].cancel()
+        
+        final_results["uploads"] = self.upload_bytes
+        uploaded = sum(stats["bytes"] for stats in self.upload_bytes.values())
+        full_frames = sum(stats["full_frame_bytes"] for stats in self.upload_bytes.values())
+        logger.info(f"Uploaded {uploaded / 1024:.0f} KB of images to vision APIs "
+                    f"({full_frames / 1024:.0f} KB as full-resolution frames)")
+        final_results["openai_usage"] = self.openai_usage
+        logger.info(f"OpenAI usage ({self.openai_mode} mode): {self.openai_usage}")
+        if self.cache:
+            final_results["vision_cache"] = self.cache.stats()
+            logger.info(f"Vision cache: {final_results['vision_cache']}")
         
         # Save results
         analysis_file = self.output_dir / "final_analysis.json"
@@ -263,25 +761,117 @@ Keep the analysis natural and focused on how this frame relates to the video's c
         
         logger.info(f"Analysis complete. Results saved to {analysis_file}")
         return final_results
+    
+    async def analyze_video(self, scene_changes: List[FrameBundle], motion_scores: List[Tuple[FrameBundle, float]], video_duration: float) -> dict:
+        """
+        Main analysis workflow with optimized API usage.
+        Analyzes more frames with Google Vision and uses OpenAI for final confirmation.
+        
+        Args:
+            scene_changes: List of frames where scene changes were detected
+            motion_scores: List of tuples containing (frame, motion_score)
+            video_duration: Duration of the video in seconds
+            
+        Returns:
+            Dictionary containing analysis results
+        """
+        # Convert motion scores to Python floats
+        motion_scores = [(frame, float(score)) for frame, score in motion_scores]
+        
+        # Select key frames for analysis
+        key_frames = self.select_key_frames(scene_changes, motion_scores)
+        logger.info(f"Selected {len(key_frames)} key frames for analysis")
+        
+        if self.speculative_openai:
+            # One request per frame, so results arrive one by one and the
+            # OpenAI request can start on the first good frame
+            results = await asyncio.gather(*(self._annotate_frame(frame) for frame in key_frames))
+            annotated = [
+                (frame, frame_result, success)
+                for frame, (frame_result, success) in zip(key_frames, results)
+            ]
+        else:
+            # Analyze all selected frames with Google Vision in one batched request
+            annotated = await self._annotate_frames(key_frames)
+        
+        return await self._finish_analysis(annotated)
+    
+    async def analyze_frame_stream(self, frames: AsyncIterator[FrameBundle], video_duration: float, max_frames: int = 8) -> dict:
+        """
+        Analyze frames as Step 2 produces them.
+        Google Vision requests start as soon as each frame arrives, overlapping
+        network latency with decoding of the rest of the video; with
+        speculative_openai the OpenAI request can start before the video has
+        been fully decoded. Frames arrive
+        already spaced out by Step 2, so the first max_frames are analyzed
+        instead of re-ranking them with select_key_frames.
+        
+        Args:
+            frames: Async iterator of frames from Step 2
+            video_duration: Duration of the video in seconds
+            max_frames: Maximum number of frames to analyze (default: 8)
+            
+        Returns:
+            Dictionary containing analysis results
+        """
+        received = []
+        tasks = []
+        try:
+            async for frame in frames:
+                received.append(frame)
+                if len(tasks) < max_frames:
+                    tasks.append(asyncio.create_task(self._annotate_frame(frame)))
+        except BaseException:
+            # Step 2 failed or the job was cancelled mid-stream: drop the requests already started
+            for task in tasks:
+                task.cancel()
+            if self._speculation is not None:
+                self._speculation[2].cancel()
+                self._speculation = None
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        logger.info(f"Received {len(received)} frames, analyzing {len(tasks)}")
+        
+        # Record what Step 2 found, as the non-streaming path does in VideoBot
+        self.metadata.setdefault("scene_changes", [frame.name for frame in received if frame.is_scene_change])
+        self.metadata.setdefault("motion_scores", [(frame.name, float(frame.motion_score)) for frame in received])
+        
+        results = await asyncio.gather(*tasks)
+        annotated = [
+            (frame, frame_result, success)
+            for frame, (frame_result, success) in zip(received, results)
+        ]
+        return await self._finish_analysis(annotated)
 
 async def execute_step(
-    frames_dir: Path,
     output_dir: Path,
     metadata: dict,
-    scene_changes: List[Path],
-    motion_scores: List[Tuple[Path, float]],
-    video_duration: float
+    scene_changes: List[FrameBundle],
+    motion_scores: List[Tuple[FrameBundle, float]],
+    video_duration: float,
+    use_cache: bool = True,
+    speculative_openai: bool = False,
+    openai_mode: str = "single"
 ) -> dict:
     """
     Execute frame analysis step.
+    Images are uploaded as each frame's api_jpeg; bytes sent per API are
+    reported under "uploads" in the results. API calls do not block the
+    event loop and are bounded by get_api_semaphore(). Results for frames
+    seen before come from the vision cache, whose hit counters are
+    reported under "vision_cache".
     
     Args:
-        frames_dir: Directory containing extracted frames
         output_dir: Directory to save analysis results
         metadata: Video metadata dictionary
         scene_changes: List of frames where scene changes were detected
-        motion_scores: List of tuples containing (frame path, motion score)
+        motion_scores: List of tuples containing (frame, motion score)
         video_duration: Duration of the video in seconds
+        use_cache: Serve repeated frames from the shared vision cache (see get_vision_cache)
+        speculative_openai: Start the OpenAI request on the first confident or
+            scene-change frame instead of after every Google Vision result
+        openai_mode: "single" (most confident frame) or "multi" (every frame
+            in one request); token usage is reported under "openai_usage"
         
     Returns:
         Dictionary containing analysis results
@@ -289,13 +879,57 @@ async def execute_step(
     logger.debug("Step 3: Analyzing frames...")
     
     # Convert motion scores to Python floats
-    motion_scores = [(path, float(score)) for path, score in motion_scores]
+    motion_scores = [(frame, float(score)) for frame, score in motion_scores]
     
     # Initialize analyzer with metadata
-    analyzer = VisionAnalyzer(frames_dir, output_dir, metadata)
+    analyzer = VisionAnalyzer(output_dir, metadata, use_cache=use_cache, speculative_openai=speculative_openai,
+                              openai_mode=openai_mode)
     
     # Analyze video with provided parameters
-    results = await analyzer.analyze_video(scene_changes, motion_scores, float(video_duration))
+    try:
+        results = await analyzer.analyze_video(scene_changes, motion_scores, float(video_duration))
+    finally:
+        await analyzer.close()
+    
+    logger.debug(f"Analyzed {len(results['frames'])} frames")
+    return results 
+
+async def execute_stream_step(
+    output_dir: Path,
+    metadata: dict,
+    frames: AsyncIterator[FrameBundle],
+    video_duration: float,
+    use_cache: bool = True,
+    speculative_openai: bool = False,
+    openai_mode: str = "single"
+) -> dict:
+    """
+    Execute frame analysis step on a stream of frames.
+    
+    Args:
+        output_dir: Directory to save analysis results
+        metadata: Video metadata dictionary
+        frames: Async iterator of frames, e.g. from Step 2's execute_step_streaming
+        video_duration: Duration of the video in seconds
+        use_cache: Serve repeated frames from the shared vision cache (see get_vision_cache)
+        speculative_openai: Start the OpenAI request on the first confident or
+            scene-change frame instead of after every Google Vision result
+        openai_mode: "single" (most confident frame) or "multi" (every frame
+            in one request); token usage is reported under "openai_usage"
+        
+    Returns:
+        Dictionary containing analysis results
+    """
+    logger.debug("Step 3: Analyzing streamed frames...")
+    
+    # Initialize analyzer with metadata
+    analyzer = VisionAnalyzer(output_dir, metadata, use_cache=use_cache, speculative_openai=speculative_openai,
+                              openai_mode=openai_mode)
+    
+    try:
+        results = await analyzer.analyze_frame_stream(frames, float(video_duration))
+    finally:
+        await analyzer.close()
     
     logger.debug(f"Analyzed {len(results['frames'])} frames")
-    return results 
\ No newline at end of file
+    return results
@@ -136,10 +136,10 @@ Example: "دیکھیے کیسے یہ خوبصورت منظر..."
                     recurring = objects.intersection(prev_objects)
                     sequence['recurring_elements'].update(recurring)
             
-            # Track scene transitions
+            # Track scene transitions, using Step 2's scene-change flag when present
             if len(sequence['timeline']) > 0:
                 prev_time = sequence['timeline'][-1]['timestamp']
-                if timestamp - prev_time > 2.0:  # Significant time gap
+                if frame.get('scene_change') or timestamp - prev_time > 2.0:  # Cut or significant time gap
                     sequence['scene_transitions'].append(timestamp)
             
             sequence['timeline'].append({
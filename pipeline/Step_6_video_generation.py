@@ -7,7 +7,7 @@ import os
 import logging
 import re
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
@@ -117,7 +117,8 @@ class VideoGenerator:
                 logger.warning(f"Error cleaning up resource {resource_id}: {str(e)}")
         self.uploaded_resources = []
             
-    async def generate_video(self, video_id: str, audio_id: str, output_path: Path) -> Optional[Path]:
+    async def generate_video(self, video_id: str, audio_id: str, output_path: Path,
+                             video_size: Optional[Tuple[int, int]] = None) -> Optional[Path]:
         """
         Generate final video with optimized processing.
         
@@ -125,6 +126,8 @@ class VideoGenerator:
             video_id: Public ID of uploaded video
             audio_id: Public ID of uploaded audio
             output_path: Path to save the final video
+            video_size: Display (width, height) of the video; looked up on
+                Cloudinary when not known
             
         Returns:
             Path to generated video if successful, None otherwise
@@ -133,9 +136,12 @@ class VideoGenerator:
             video = CloudinaryVideo(video_id)
             
             # Get video details
-            details = cloudinary.api.resource(video_id, resource_type='video')
-            width = details.get('width', 0)
-            height = details.get('height', 0)
+            if video_size:
+                width, height = video_size
+            else:
+                details = cloudinary.api.resource(video_id, resource_type='video')
+                width = details.get('width', 0)
+                height = details.get('height', 0)
             
             # Calculate aspect ratio
             aspect_ratio = width / height if height else 0
@@ -208,7 +214,8 @@ async def execute_step(
     video_file: Path,
     audio_file: Path,
     output_dir: Path,
-    style_name: str
+    style_name: str,
+    video_size: Optional[Tuple[int, int]] = None
 ) -> Optional[Path]:
     """
     Execute video generation step.
@@ -218,6 +225,9 @@ async def execute_step(
         audio_file: Path to the generated audio file
         output_dir: Directory to save generated video
         style_name: Name of the commentary style used
+        video_size: Display (width, height) of the video, e.g.
+            VideoProbe.display_size from Step 2, used for the aspect-ratio
+            decision
         
     Returns:
         Path to the generated video if successful, None otherwise
@@ -243,12 +253,17 @@ async def execute_step(
         if not video_response or not audio_response:
             return None
         
+        # Without a known size the upload response has it
+        if not video_size and video_response.get('width') and video_response.get('height'):
+            video_size = (video_response['width'], video_response['height'])
+        
         # Generate final video
         output_file = output_dir / f"final_video_{style_name}.mp4"
         result = await generator.generate_video(
             video_response['public_id'],
             audio_response['public_id'],
-            output_file
+            output_file,
+            video_size
         )
         
         return result
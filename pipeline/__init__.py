@@ -3,7 +3,9 @@ Video processing pipeline package
 """
 
 from .Step_1_download_video import download_from_url
-from .Step_2_extract_frames import execute_step as extract_frames
+from .Step_2_extract_frames import (
+    execute_step as extract_frames, FrameBundle, FrameRecord, VideoProbe, probe_video
+)
 from .Step_3_analyze_frames import execute_step as analyze_frames
 from .Step_4_generate_commentary import execute_step as generate_commentary
 from .Step_5_generate_audio import execute_step as generate_audio
@@ -12,6 +14,10 @@ from .Step_6_video_generation import execute_step as generate_video
 __all__ = [
     'download_from_url',
     'extract_frames',
+    'FrameBundle',
+    'FrameRecord',
+    'VideoProbe',
+    'probe_video',
     'analyze_frames',
     'generate_commentary',
     'generate_audio',